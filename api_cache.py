@@ -0,0 +1,144 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+from kivy.logger import Logger
+
+from app_config import get_cache_dir
+
+# Seconds a cached response is served without contacting the API at all.
+DEFAULT_TTLS = {
+    "search": 30 * 60,
+    "videos": 15 * 60,
+}
+DEFAULT_TTL = 10 * 60
+
+# Seconds past the TTL during which a stale response may still be served
+# while it is revalidated in the background.
+DEFAULT_MAX_STALE = 24 * 60 * 60
+
+# Request parameters that do not change the response body.
+IGNORED_PARAMS = ("key",)
+
+
+class CacheEntry:
+    def __init__(self, body: Dict, etag: Optional[str], fetched_at: float, ttl: int):
+        self.body = body
+        self.etag = etag
+        self.fetched_at = fetched_at
+        self.ttl = ttl
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.fetched_at
+
+    def is_fresh(self) -> bool:
+        return self.age < self.ttl
+
+    def is_usable(self, max_stale: int) -> bool:
+        return self.age < self.ttl + max_stale
+
+
+class ResponseCache:
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttls: Optional[Dict[str, int]] = None,
+        max_stale: int = DEFAULT_MAX_STALE,
+    ):
+        self.path = path or os.path.join(get_cache_dir(), "api_cache.sqlite3")
+        self.ttls = dict(DEFAULT_TTLS)
+        if ttls:
+            self.ttls.update(ttls)
+        self.max_stale = max_stale
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " endpoint TEXT NOT NULL,"
+            " etag TEXT,"
+            " body TEXT NOT NULL,"
+            " fetched_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+        # Drop responses too old to serve even while revalidating
+        self.purge()
+
+    @staticmethod
+    def make_key(endpoint: str, params: Dict) -> str:
+        normalized = {
+            str(k): str(v)
+            for k, v in params.items()
+            if k not in IGNORED_PARAMS and v is not None
+        }
+        return f"{endpoint}?{json.dumps(normalized, sort_keys=True)}"
+
+    def ttl_for(self, endpoint: str) -> int:
+        return self.ttls.get(endpoint, DEFAULT_TTL)
+
+    def get(self, endpoint: str, params: Dict) -> Optional[CacheEntry]:
+        key = self.make_key(endpoint, params)
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT etag, body, fetched_at FROM responses WHERE key = ?",
+                    (key,),
+                ).fetchone()
+        except sqlite3.Error as e:
+            Logger.error(f"Response cache read error: {e}")
+            return None
+
+        if not row:
+            return None
+
+        etag, body, fetched_at = row
+        try:
+            return CacheEntry(
+                json.loads(body), etag, fetched_at, self.ttl_for(endpoint)
+            )
+        except ValueError:
+            return None
+
+    def put(self, endpoint: str, params: Dict, body: Dict, etag: Optional[str]):
+        key = self.make_key(endpoint, params)
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses"
+                    " (key, endpoint, etag, body, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                    (key, endpoint, etag, json.dumps(body), time.time()),
+                )
+                self._conn.commit()
+        except sqlite3.Error as e:
+            Logger.error(f"Response cache write error: {e}")
+
+    def touch(self, endpoint: str, params: Dict):
+        key = self.make_key(endpoint, params)
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "UPDATE responses SET fetched_at = ? WHERE key = ?",
+                    (time.time(), key),
+                )
+                self._conn.commit()
+        except sqlite3.Error as e:
+            Logger.error(f"Response cache write error: {e}")
+
+    def purge(self):
+        cutoff = time.time() - max(DEFAULT_TTL, *self.ttls.values()) - self.max_stale
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "DELETE FROM responses WHERE fetched_at < ?", (cutoff,)
+                )
+                self._conn.commit()
+        except sqlite3.Error as e:
+            Logger.error(f"Response cache purge error: {e}")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
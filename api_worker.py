@@ -0,0 +1,83 @@
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+from kivy.clock import Clock
+from kivy.logger import Logger
+
+
+class APIWorker:
+    """Runs blocking API calls on a thread pool and delivers results on the
+    Kivy main thread.
+
+    Requests are grouped into channels. Submitting to a channel supersedes
+    whatever was previously submitted there: a queued call is cancelled and
+    the result of a running call is discarded instead of delivered.
+    """
+
+    def __init__(self, max_workers: int = 2):
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="raspitube-api"
+        )
+        self._generations: Dict[str, int] = {}
+        self._futures: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def submit(
+        self,
+        channel: str,
+        fn: Callable,
+        *args,
+        on_result: Optional[Callable] = None,
+        on_error: Optional[Callable] = None,
+        **kwargs,
+    ) -> Future:
+        with self._lock:
+            generation = self._generations.get(channel, 0) + 1
+            self._generations[channel] = generation
+            previous = self._futures.get(channel)
+            if previous:
+                previous.cancel()
+
+            future = self.executor.submit(fn, *args, **kwargs)
+            self._futures[channel] = future
+
+        def deliver(dt):
+            if not self.is_current(channel, generation):
+                Logger.debug(f"APIWorker: discarding stale result for {channel}")
+                return
+
+            error = future.exception()
+            if error is not None:
+                if on_error:
+                    on_error(error)
+                else:
+                    Logger.error(f"APIWorker: {channel} request failed: {error}")
+            elif on_result:
+                on_result(future.result())
+
+        def on_done(f):
+            if f.cancelled() or not self.is_current(channel, generation):
+                return
+            Clock.schedule_once(deliver, 0)
+
+        future.add_done_callback(on_done)
+        return future
+
+    def is_current(self, channel: str, generation: int) -> bool:
+        with self._lock:
+            return self._generations.get(channel) == generation
+
+    def cancel(self, channel: str):
+        with self._lock:
+            self._generations[channel] = self._generations.get(channel, 0) + 1
+            future = self._futures.pop(channel, None)
+        if future:
+            future.cancel()
+
+    def shutdown(self):
+        with self._lock:
+            for future in self._futures.values():
+                future.cancel()
+            self._futures.clear()
+        self.executor.shutdown(wait=False)
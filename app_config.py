@@ -0,0 +1,27 @@
+import json
+import os
+from typing import Dict
+
+from kivy.logger import Logger
+
+CONFIG_PATH = "config.json"
+
+
+def load_config(path: str = CONFIG_PATH) -> Dict:
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        Logger.error(f"Error reading config: {e}")
+        return {}
+
+
+def get_cache_dir(*parts: str) -> str:
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    path = os.path.join(base, "raspitube", *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
@@ -0,0 +1,188 @@
+import glob
+import os
+import re
+import threading
+from typing import Dict, Iterable, Optional, Set
+
+from kivy.logger import Logger
+
+DEFAULT_MAX_HEIGHT = 720
+
+CODEC_FAMILIES = (
+    ("avc", "h264"),
+    ("h264", "h264"),
+    ("hev", "hevc"),
+    ("hvc", "hevc"),
+    ("vp09", "vp9"),
+    ("vp9", "vp9"),
+    ("vp8", "vp8"),
+    ("av01", "av1"),
+)
+
+# Score penalty for decoding each codec in software, relative to hardware
+SOFTWARE_DECODE_COST = {
+    "h264": 150,
+    "vp8": 200,
+    "hevc": 350,
+    "vp9": 350,
+    "av1": 600,
+}
+
+# v4l2 memory-to-memory decoder names and the codecs they handle
+HARDWARE_DECODERS = (
+    ("bcm2835-codec-decode", "h264"),
+    ("rpivid", "hevc"),
+    ("rpi-hevc-dec", "hevc"),
+)
+
+
+def parse_quality(value, default: int = DEFAULT_MAX_HEIGHT) -> int:
+    """Turn a ``video_quality`` setting such as ``"720p"`` into a height."""
+    if isinstance(value, int):
+        return value
+    match = re.match(r"\s*(\d+)", str(value or ""))
+    return int(match.group(1)) if match else default
+
+
+def codec_family(vcodec: Optional[str]) -> Optional[str]:
+    if not vcodec or vcodec == "none":
+        return None
+    vcodec = vcodec.lower()
+    for prefix, family in CODEC_FAMILIES:
+        if vcodec.startswith(prefix):
+            return family
+    return vcodec.split(".")[0]
+
+
+class DecoderCapabilities:
+    def __init__(
+        self,
+        hardware: Iterable[str] = (),
+        low_power: bool = False,
+    ):
+        self.hardware: Set[str] = set(hardware)
+        self.low_power = low_power
+
+    def decode_cost(self, family: Optional[str]) -> int:
+        if family in self.hardware:
+            return 0
+        cost = SOFTWARE_DECODE_COST.get(family, 400)
+        # A desktop CPU copes with software decoding; only nudge the order
+        return cost if self.low_power else cost // 10
+
+    @property
+    def software_max_height(self) -> int:
+        return 480 if self.low_power else 2160
+
+    def __repr__(self):
+        return (
+            f"DecoderCapabilities(hardware={sorted(self.hardware)}, "
+            f"low_power={self.low_power})"
+        )
+
+
+_capabilities: Optional[DecoderCapabilities] = None
+_capabilities_lock = threading.Lock()
+
+
+def probe_decoders() -> DecoderCapabilities:
+    """Detect hardware video decoders; the result is cached for the process."""
+    global _capabilities
+    with _capabilities_lock:
+        if _capabilities is not None:
+            return _capabilities
+
+        hardware = set()
+        for name_path in glob.glob("/sys/class/video4linux/video*/name"):
+            try:
+                with open(name_path, "r") as f:
+                    name = f.read().strip()
+            except OSError:
+                continue
+            for decoder, family in HARDWARE_DECODERS:
+                if decoder in name:
+                    hardware.add(family)
+
+        low_power = False
+        try:
+            with open("/proc/device-tree/model", "r") as f:
+                low_power = "Raspberry Pi" in f.read()
+        except OSError:
+            low_power = os.uname().machine.startswith(("arm", "aarch64"))
+
+        _capabilities = DecoderCapabilities(hardware, low_power)
+        Logger.info(f"Format selection: {_capabilities}")
+        return _capabilities
+
+
+class FormatSelector:
+    """Ranks yt-dlp formats in a single pass.
+
+    Only formats carrying both audio and video are considered, since the
+    player is handed a single URL. Resolution counts up to ``max_height``;
+    above it every extra line is penalised. Codecs the device cannot decode
+    in hardware, high frame rates on low-power devices and non-mp4
+    containers cost points, and bitrate breaks ties.
+    """
+
+    def __init__(
+        self,
+        max_height: int = DEFAULT_MAX_HEIGHT,
+        capabilities: Optional[DecoderCapabilities] = None,
+    ):
+        self.max_height = max_height
+        self.capabilities = capabilities
+
+    @property
+    def cache_key(self) -> str:
+        return f"scored<={self.max_height}"
+
+    def score(self, fmt: Dict) -> float:
+        capabilities = self.capabilities or probe_decoders()
+        height = fmt.get("height") or 0
+        family = codec_family(fmt.get("vcodec"))
+
+        if height <= self.max_height:
+            score = float(height)
+        else:
+            score = self.max_height - (height - self.max_height) * 2.0
+
+        decode_cost = capabilities.decode_cost(family)
+        score -= decode_cost
+        if decode_cost and height > capabilities.software_max_height:
+            # Software decoding at this size drops frames on this device
+            score -= 1000
+
+        fps = fmt.get("fps") or 30
+        if fps > 30:
+            score -= 150 if capabilities.low_power else 10
+
+        if fmt.get("ext") == "mp4":
+            score += 25
+
+        tbr = fmt.get("tbr") or 0
+        score += min(tbr, 5000) / 1000
+
+        return score
+
+    @staticmethod
+    def is_playable(fmt: Dict) -> bool:
+        """Whether ``fmt`` is a single URL carrying both audio and video."""
+        return (
+            bool(fmt.get("url"))
+            and fmt.get("vcodec") != "none"
+            and fmt.get("acodec") != "none"
+        )
+
+    def select(self, formats: Iterable[Dict]) -> Optional[Dict]:
+        best = None
+        best_score = float("-inf")
+
+        for fmt in formats:
+            if not self.is_playable(fmt):
+                continue
+            score = self.score(fmt)
+            if score > best_score:
+                best, best_score = fmt, score
+
+        return best
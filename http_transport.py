@@ -0,0 +1,151 @@
+import random
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from kivy.logger import Logger
+from requests.adapters import HTTPAdapter
+
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+class RetryBudget:
+    """Caps retries across all requests to a fraction of recent traffic.
+
+    Every request deposits ``ratio`` tokens and every retry withdraws one,
+    so a failing upstream cannot multiply load by the per-request retry
+    count. ``min_per_second`` keeps a trickle of retries available when
+    traffic is light.
+    """
+
+    def __init__(
+        self, ratio: float = 0.2, min_per_second: float = 0.1, max_tokens: float = 10
+    ):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self._tokens = max_tokens
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        self._tokens = min(
+            self.max_tokens, self._tokens + elapsed * self.min_per_second
+        )
+
+    def record_request(self):
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+
+class HTTPTransport:
+    def __init__(
+        self,
+        pool_maxsize: int = 4,
+        max_retries: int = 3,
+        backoff_factor: float = 0.5,
+        retry_budget: Optional[RetryBudget] = None,
+    ):
+        self.pool_maxsize = pool_maxsize
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.retry_budget = retry_budget or RetryBudget()
+        self._sessions: Dict[str, requests.Session] = {}
+        self._lock = threading.Lock()
+
+    def session_for(self, url: str) -> requests.Session:
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+
+        with self._lock:
+            session = self._sessions.get(origin)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=1, pool_maxsize=self.pool_maxsize, max_retries=0
+                )
+                session.mount(origin, adapter)
+                self._sessions[origin] = session
+            return session
+
+    def get(self, url: str, retry: bool = True, **kwargs) -> requests.Response:
+        return self.request("GET", url, retry=retry, **kwargs)
+
+    def request(
+        self, method: str, url: str, retry: bool = True, **kwargs
+    ) -> requests.Response:
+        session = self.session_for(url)
+        attempt = 0
+
+        while True:
+            self.retry_budget.record_request()
+            try:
+                response = session.request(method, url, **kwargs)
+                if response.status_code not in RETRY_STATUS_CODES:
+                    return response
+                if not self._should_retry(retry, attempt):
+                    return response
+                reason = f"HTTP {response.status_code}"
+                # Drain the body so the connection goes back to the pool.
+                response.content
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if not self._should_retry(retry, attempt):
+                    raise
+                reason = str(e)
+
+            delay = self.backoff_factor * (2**attempt) * (0.5 + random.random())
+            attempt += 1
+            Logger.debug(
+                f"HTTPTransport: retry {attempt} for {urlsplit(url).netloc} "
+                f"in {delay:.2f}s ({reason})"
+            )
+            time.sleep(delay)
+
+    def _should_retry(self, retry: bool, attempt: int) -> bool:
+        return retry and attempt < self.max_retries and self.retry_budget.try_acquire()
+
+    def prewarm(self, url: str):
+        """Open a pooled connection to ``url``'s host in the background so the
+        first real request skips DNS and the TLS handshake."""
+
+        def connect():
+            try:
+                # Reading the (empty) body returns the connection to the pool.
+                self.request("HEAD", url, retry=False, timeout=5).content
+                Logger.debug(f"HTTPTransport: pre-connected to {urlsplit(url).netloc}")
+            except requests.RequestException as e:
+                Logger.debug(f"HTTPTransport: pre-connect failed: {e}")
+
+        threading.Thread(target=connect, daemon=True).start()
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+_default_transport: Optional[HTTPTransport] = None
+_default_transport_lock = threading.Lock()
+
+
+def get_transport() -> HTTPTransport:
+    global _default_transport
+    with _default_transport_lock:
+        if _default_transport is None:
+            _default_transport = HTTPTransport()
+        return _default_transport
@@ -7,15 +7,17 @@ from kivy.logger import Logger
 from kivy.uix.behaviors import ButtonBehavior
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.button import Button
-from kivy.uix.gridlayout import GridLayout
 from kivy.uix.image import Image
 from kivy.uix.label import Label
 from kivy.uix.popup import Popup
-from kivy.uix.scrollview import ScrollView
 from kivymd.app import MDApp
 from kivymd.uix.label import MDIcon
 
-from ui_components import SearchBar, VideoCard
+from api_worker import APIWorker
+from app_config import load_config
+from thumbnail_cache import ThumbnailCache, select_thumbnail
+from thumbnail_loader import PRIORITY_PREFETCH, ThumbnailLoader
+from ui_components import THUMBNAIL_SIZE, SearchBar, VideoGrid
 from video_player import VideoPlayer
 from youtube_api import YouTubeAPI
 
@@ -77,13 +79,37 @@ class RaspiTubeApp(MDApp):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.youtube_api = YouTubeAPI()
+        self.api_worker = APIWorker()
         self.video_player = VideoPlayer()
+        self.video_player.set_next_video_callback(self.on_auto_play_next)
+        self.thumbnail_loader = self._create_thumbnail_loader()
+        self.prefetched_thumbnails = []
         self.video_history = []
         self.current_view = "home"
         self.nav_buttons = {}
         self.videos_per_page = 12
+        # Each API call fills two whole pages, so paging needs at most one
+        # request ahead of the page on screen
+        self.results_per_request = 2 * self.videos_per_page
+        # One scrolling list that grows as the user nears its end
+        self.infinite_scroll = load_config().get("infinite_scroll", False)
         self.current_page = 1
         self.all_videos = []
+        self.result_cursor = None
+        self.loading_more = False
+        self.pending_next_page = False
+        # Set when a page fails in infinite mode; loading waits for a retry tap
+        self.load_more_failed = False
+        self.hovered_video_id = None
+
+    def _create_thumbnail_loader(self):
+        if not load_config().get("cache_thumbnails", True):
+            return None
+        try:
+            return ThumbnailLoader(ThumbnailCache(), workers=2)
+        except Exception as e:
+            Logger.warning(f"Thumbnail cache unavailable: {e}")
+            return None
 
     def build(self):
         Window.maximize()
@@ -184,6 +210,7 @@ class RaspiTubeApp(MDApp):
             ("home", "Home"),
             ("trending-up", "Trending"),
             ("history", "History"),
+            ("clock-outline", "Watch Later"),
         ]
 
         for icon, text in sidebar_items:
@@ -204,13 +231,22 @@ class RaspiTubeApp(MDApp):
 
         main_content = BoxLayout(orientation="vertical", padding=[24, 12, 24, 0])
 
-        self.video_grid = GridLayout(
-            cols=4, spacing=16, size_hint_y=None, padding=[0, 0, 0, 24]
+        # Shown instead of the grid when a view has no videos
+        self.empty_label = Label(
+            text="",
+            color=(0.4, 0.4, 0.4, 1),
+            font_size="16sp",
+            halign="center",
+            size_hint_y=None,
+            height=0,
         )
-        self.video_grid.bind(minimum_height=self.video_grid.setter("height"))
 
-        scroll_view = ScrollView()
-        scroll_view.add_widget(self.video_grid)
+        # Recycling grid: card widgets are pooled and rebound on page changes
+        self.video_grid = VideoGrid(thumbnail_loader=self.thumbnail_loader, cols=4)
+        self.video_grid.bind(on_video_select=self.play_video)
+        self.video_grid.bind(on_watch_later=self.add_to_watch_later)
+        if self.infinite_scroll:
+            self.video_grid.bind(on_visible_range=self.on_grid_visible_range)
 
         # Pagination controls
         self.pagination_layout = BoxLayout(
@@ -255,8 +291,21 @@ class RaspiTubeApp(MDApp):
         self.pagination_layout.add_widget(self.next_button)
         self.pagination_layout.add_widget(right_spacer)
 
-        main_content.add_widget(scroll_view)
-        main_content.add_widget(self.pagination_layout)
+        # Infinite scroll has no pagination bar; a failed page offers a retry
+        self.retry_button = Button(
+            text="Couldn't load more videos. Tap to retry.",
+            size_hint_y=None,
+            height=50,
+            background_color=(0.2, 0.4, 0.8, 1),
+            color=(1, 1, 1, 1),
+        )
+        self.retry_button.bind(on_press=self.retry_load_more)
+        self.main_content = main_content
+
+        main_content.add_widget(self.empty_label)
+        main_content.add_widget(self.video_grid)
+        if not self.infinite_scroll:
+            main_content.add_widget(self.pagination_layout)
 
         content_layout.add_widget(sidebar)
         content_layout.add_widget(main_content)
@@ -264,6 +313,8 @@ class RaspiTubeApp(MDApp):
         main_layout.add_widget(header_layout)
         main_layout.add_widget(content_layout)
 
+        Window.bind(mouse_pos=self.on_mouse_pos)
+        self.youtube_api.prewarm()
         Clock.schedule_once(self.load_trending_videos, 1)
 
         return main_layout
@@ -273,48 +324,228 @@ class RaspiTubeApp(MDApp):
             self.search_videos(query)
 
     def search_videos(self, query):
-        try:
-            self.current_page = 1  # Reset to first page
-            videos = self.youtube_api.search_videos(query)
-            self.display_videos(videos)
-        except Exception as e:
-            Logger.error(f"Search error: {e}")
-            self.show_error("Search failed. Please check your internet connection.")
+        self.current_view = "search"
+        self.current_page = 1  # Reset to first page
+        self.load_videos_async(
+            self.youtube_api.search_cursor(query, max_results=self.results_per_request),
+            error_message="Search failed. Please check your internet connection.",
+        )
 
     def load_trending_videos(self, dt):
-        try:
-            self.current_page = 1  # Reset to first page
-            videos = self.youtube_api.get_trending_videos()
-            self.display_videos(videos)
-        except Exception as e:
-            Logger.error(f"Trending videos error: {e}")
-            self.show_error("Failed to load trending videos.")
+        self.current_page = 1  # Reset to first page
+        self.load_videos_async(
+            self.youtube_api.trending_cursor(max_results=self.results_per_request),
+            error_message="Failed to load trending videos.",
+        )
+
+    def load_videos_async(self, cursor, error_message="Failed to load videos."):
+        """Fetch the first page off the UI thread; newer loads supersede older ones"""
+
+        def on_error(error):
+            Logger.error(f"Video load error: {error}")
+            self.show_error(error_message)
+
+        self.reset_result_cursor(cursor)
+        self.api_worker.submit(
+            "video_grid",
+            cursor.fetch_next,
+            on_result=self.display_videos,
+            on_error=on_error,
+        )
+
+    def reset_result_cursor(self, cursor=None):
+        self.api_worker.cancel("video_grid_more")
+        self.result_cursor = cursor
+        self.loading_more = False
+        self.pending_next_page = False
+        self.hide_load_more_retry()
+
+    def has_more_results(self):
+        return self.result_cursor is not None and self.result_cursor.has_more
+
+    def ensure_next_page_loaded(self, speculative=True):
+        """Start loading results for the page after the current one"""
+        self.ensure_results_loaded(
+            (self.current_page + 1) * self.videos_per_page, speculative
+        )
+
+    def ensure_results_loaded(self, needed, speculative=True):
+        """Start loading more results until ``needed`` videos are known"""
+        if (
+            len(self.all_videos) >= needed
+            or self.loading_more
+            or self.load_more_failed
+            or not self.has_more_results()
+        ):
+            return
+        if speculative and not self.result_cursor.prefetch_enabled:
+            # Low quota: only fetch once the user asks for the page
+            return
+
+        def on_error(error):
+            Logger.error(f"Loading more videos failed: {error}")
+            self.loading_more = False
+            self.pending_next_page = False
+            if self.infinite_scroll:
+                self.show_load_more_retry()
+
+        self.loading_more = True
+        self.api_worker.submit(
+            "video_grid_more",
+            self.result_cursor.fetch_next,
+            on_result=self.on_more_videos,
+            on_error=on_error,
+        )
+
+    def on_grid_visible_range(self, video_grid, first, last):
+        self.follow_scroll_position()
+
+    def follow_scroll_position(self):
+        """Infinite scroll: work ahead of the rows the grid is showing"""
+        if not self.all_videos or self.video_grid.visible_range is None:
+            return
+        first, last = self.video_grid.visible_range
+        upcoming = self.all_videos[last + 1 : last + 1 + self.videos_per_page]
+
+        # Visible cards first, then the rows about to scroll in
+        self.video_player.pre_resolve(
+            [
+                video["video_id"]
+                for video in self.all_videos[first : last + 1] + upcoming
+            ]
+        )
+        self.cancel_prefetched_thumbnails()
+        self.prefetch_thumbnails(upcoming)
+
+        # Keep a page of results below the viewport; on the last row fetch
+        # even when quota only allows requested pages
+        self.ensure_results_loaded(last + 1 + self.videos_per_page)
+        if last >= len(self.all_videos) - self.video_grid.layout_manager.cols:
+            self.ensure_results_loaded(len(self.all_videos) + 1, speculative=False)
+
+    def show_load_more_retry(self):
+        self.load_more_failed = True
+        if self.retry_button.parent is None:
+            self.main_content.add_widget(self.retry_button)
+
+    def hide_load_more_retry(self):
+        self.load_more_failed = False
+        if self.retry_button.parent is not None:
+            self.main_content.remove_widget(self.retry_button)
+
+    def retry_load_more(self, instance):
+        self.hide_load_more_retry()
+        self.ensure_results_loaded(len(self.all_videos) + 1, speculative=False)
+
+    def on_more_videos(self, videos):
+        self.loading_more = False
+        self.all_videos.extend(videos)
+
+        if self.infinite_scroll:
+            if not videos:
+                # A failed page keeps its token; retrying it every frame
+                # would spin and burn quota, so wait for the user instead
+                self.show_load_more_retry()
+                return
+            # Rows are appended below; the pooled cards keep the view in place
+            self.video_grid.append_videos(videos)
+            self.follow_scroll_position()
+            return
+
+        if self.pending_next_page:
+            self.pending_next_page = False
+            if self.current_page < self.total_pages():
+                self.current_page += 1
+                self.update_video_display()
+                return
+
+        self.update_pagination_controls()
+        if videos:
+            self.ensure_next_page_loaded()
 
     def display_videos(self, videos):
-        self.all_videos = videos
+        self.all_videos = list(videos)
         self.update_video_display()
 
     def update_video_display(self):
-        self.video_grid.clear_widgets()
+        self.cancel_thumbnail_loads()
+        self.hide_empty_message()
+
+        if self.infinite_scroll:
+            # The grid reports the rows it shows, and follow_scroll_position
+            # resolves, prefetches and loads ahead of them
+            self.video_grid.set_videos(self.all_videos)
+            self.video_grid.scroll_y = 1
+            return
 
         start_index = (self.current_page - 1) * self.videos_per_page
         end_index = start_index + self.videos_per_page
         page_videos = self.all_videos[start_index:end_index]
 
-        for video in page_videos:
-            video_card = VideoCard(video)
-            video_card.bind(on_video_select=self.play_video)
-            self.video_grid.add_widget(video_card)
+        # Rebinds the pooled cards instead of building new ones
+        self.video_grid.set_videos(page_videos)
+        self.video_grid.scroll_y = 1
 
-        self.update_pagination_controls()
+        # Resolve stream URLs for this page's cards, top-left first
+        self.video_player.pre_resolve([video["video_id"] for video in page_videos])
+        self.prefetch_thumbnails(
+            self.all_videos[end_index : end_index + self.videos_per_page]
+        )
 
-    def update_pagination_controls(self):
-        total_pages = (
+        self.update_pagination_controls()
+        self.ensure_next_page_loaded()
+
+    def prefetch_thumbnails(self, videos):
+        """Queue thumbnails for the next page behind the visible ones"""
+        if not self.thumbnail_loader:
+            return
+
+        for index, video in enumerate(videos):
+            url = select_thumbnail(
+                video.get("thumbnails", {}),
+                *THUMBNAIL_SIZE,
+                fallback=video.get("thumbnail_url", ""),
+            )
+            if url:
+                self.prefetched_thumbnails.append(
+                    self.thumbnail_loader.request(
+                        url, THUMBNAIL_SIZE, PRIORITY_PREFETCH + index
+                    )
+                )
+
+    def cancel_thumbnail_loads(self):
+        self.video_grid.cancel_thumbnail_loads()
+        self.cancel_prefetched_thumbnails()
+
+    def cancel_prefetched_thumbnails(self):
+        for future in self.prefetched_thumbnails:
+            future.cancel()
+        self.prefetched_thumbnails = []
+
+    def on_mouse_pos(self, window, pos):
+        hovered = None
+        for card in self.video_grid.visible_cards():
+            if card.collide_point(*card.to_widget(*pos)):
+                hovered = card.video_data.get("video_id")
+                break
+
+        if hovered and hovered != self.hovered_video_id:
+            self.video_player.prioritize_pre_resolve(hovered)
+        self.hovered_video_id = hovered
+
+    def total_pages(self):
+        return (
             (len(self.all_videos) - 1) // self.videos_per_page + 1
             if self.all_videos
             else 1
         )
-        self.page_label.text = f"Page {self.current_page} of {total_pages}"
+
+    def update_pagination_controls(self):
+        total_pages = self.total_pages()
+        has_more = self.has_more_results()
+        self.page_label.text = (
+            f"Page {self.current_page} of {total_pages}{'+' if has_more else ''}"
+        )
 
         # Update previous button appearance
         if self.current_page <= 1:
@@ -325,7 +556,7 @@ class RaspiTubeApp(MDApp):
             self.prev_button.color = (1, 1, 1, 1)
 
         # Update next button appearance
-        if self.current_page >= total_pages:
+        if self.current_page >= total_pages and not has_more:
             self.next_button.background_color = (0.5, 0.5, 0.5, 1)
             self.next_button.color = (0.7, 0.7, 0.7, 1)
         else:
@@ -338,23 +569,39 @@ class RaspiTubeApp(MDApp):
             self.update_video_display()
 
     def next_page(self, instance):
-        total_pages = (
-            (len(self.all_videos) - 1) // self.videos_per_page + 1
-            if self.all_videos
-            else 1
-        )
-        if self.current_page < total_pages:
+        if self.current_page < self.total_pages():
             self.current_page += 1
             self.update_video_display()
+        elif self.has_more_results():
+            # Results for the next page are still loading; advance on arrival
+            self.pending_next_page = True
+            self.ensure_next_page_loaded(speculative=False)
 
     def play_video(self, video_card, video_data):
         try:
             self.video_history.append(video_data)
+            self.video_player.set_up_next(self.all_videos, video_data["video_id"])
             self.video_player.play_video(video_data["video_id"])
+            # Repeat views of history play from disk once downloaded
+            self.video_player.save_for_offline(video_data["video_id"])
         except Exception as e:
             Logger.error(f"Video playback error: {e}")
             self.show_error("Failed to play video.")
 
+    def on_auto_play_next(self, video_data):
+        self.video_history.append(video_data)
+        self.video_player.save_for_offline(video_data["video_id"])
+
+    def add_to_watch_later(self, video_card, video_data):
+        if self.current_view == "watch later":
+            # Right-click in the Watch Later view takes the video off the list
+            self.video_player.remove_from_watch_later(video_data["video_id"])
+            Logger.info(f"Removed from watch later: {video_data.get('title')}")
+            self.load_watch_later_videos()
+            return
+        self.video_player.add_to_watch_later(video_data)
+        Logger.info(f"Added to watch later: {video_data.get('title')}")
+
     def go_to_home(self, instance):
         """Navigate to home/landing page when logo is clicked"""
         self.on_nav_click("home")
@@ -372,35 +619,63 @@ class RaspiTubeApp(MDApp):
             self.load_trending_videos(None)
         elif nav_type == "history":
             self.load_history_videos()
+        elif nav_type == "watch later":
+            self.load_watch_later_videos()
 
     def load_home_videos(self):
-        try:
-            self.current_page = 1  # Reset to first page
-            videos = self.youtube_api.get_trending_videos()
-            self.display_videos(videos)
-        except Exception as e:
-            Logger.error(f"Home videos error: {e}")
-            self.show_error("Failed to load home videos.")
+        self.current_page = 1  # Reset to first page
+        self.load_videos_async(
+            self.youtube_api.trending_cursor(max_results=self.results_per_request),
+            error_message="Failed to load home videos.",
+        )
 
     def load_history_videos(self):
         self.current_page = 1  # Reset to first page
+        self.api_worker.cancel("video_grid")
+        self.reset_result_cursor()
         if not self.video_history:
-            self.video_grid.clear_widgets()
-            no_history_label = Label(
-                text="No videos in history yet.\nWatch some videos to see them here!",
-                color=(0.4, 0.4, 0.4, 1),
-                font_size="16sp",
-                halign="center",
+            self.show_empty_message(
+                "No videos in history yet.\nWatch some videos to see them here!"
             )
-            self.video_grid.add_widget(no_history_label)
         else:
             recent_history = list(reversed(self.video_history[-20:]))
             self.display_videos(recent_history)
 
+    def load_watch_later_videos(self):
+        self.current_page = 1  # Reset to first page
+        self.api_worker.cancel("video_grid")
+        self.reset_result_cursor()
+        videos = self.video_player.watch_later_videos()
+        if not videos:
+            self.show_empty_message(
+                "Nothing to watch later yet.\nRight-click a video to save it here!"
+            )
+        else:
+            self.display_videos(videos)
+
+    def show_empty_message(self, text):
+        self.video_player.pre_resolve([])
+        self.cancel_thumbnail_loads()
+        self.all_videos = []
+        self.video_grid.set_videos([])
+        self.empty_label.text = text
+        self.empty_label.height = 80
+        self.update_pagination_controls()
+
+    def hide_empty_message(self):
+        self.empty_label.text = ""
+        self.empty_label.height = 0
+
     def show_error(self, message):
         popup = Popup(title="Error", content=Label(text=message), size_hint=(0.6, 0.4))
         popup.open()
 
+    def on_stop(self):
+        self.api_worker.shutdown()
+        self.video_player.cleanup()
+        if self.thumbnail_loader:
+            self.thumbnail_loader.shutdown()
+
 
 if __name__ == "__main__":
     RaspiTubeApp().run()
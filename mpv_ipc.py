@@ -0,0 +1,162 @@
+import itertools
+import json
+import socket
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional
+
+from kivy.logger import Logger
+
+
+class MpvIPCError(Exception):
+    pass
+
+
+class MpvIPCClient:
+    """Client for mpv's JSON IPC protocol over a Unix socket.
+
+    Commands are tagged with a ``request_id`` and written without waiting for
+    earlier replies, so several can be in flight at once. A reader thread
+    matches replies to their futures and turns ``property-change`` events for
+    observed properties into ``on_property`` callbacks; other events go to
+    ``on_event``. Both callbacks run on the reader thread.
+    """
+
+    def __init__(
+        self,
+        socket_path: str,
+        on_property: Optional[Callable[[str, Any], None]] = None,
+        on_event: Optional[Callable[[Dict], None]] = None,
+    ):
+        self.socket_path = socket_path
+        self.on_property = on_property
+        self.on_event = on_event
+        self.properties: Dict[str, Any] = {}
+        self._sock: Optional[socket.socket] = None
+        self._pending: Dict[int, Future] = {}
+        self._observers: Dict[int, str] = {}
+        self._request_ids = itertools.count(1)
+        self._observer_ids = itertools.count(1)
+        self._send_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._reader: Optional[threading.Thread] = None
+
+    @property
+    def connected(self) -> bool:
+        return self._sock is not None
+
+    def connect(self, timeout: float = 5.0):
+        """Connect, retrying while mpv has not created the socket yet."""
+        deadline = time.monotonic() + timeout
+        while True:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                sock.connect(self.socket_path)
+                break
+            except OSError:
+                sock.close()
+                if time.monotonic() >= deadline:
+                    raise
+                time.sleep(0.05)
+
+        self._sock = sock
+        self._reader = threading.Thread(
+            target=self._read_loop, args=(sock,), name="mpv-ipc", daemon=True
+        )
+        self._reader.start()
+
+    def command_async(self, *args) -> Future:
+        future = Future()
+        sock = self._sock
+        if sock is None:
+            future.set_exception(MpvIPCError("not connected"))
+            return future
+
+        request_id = next(self._request_ids)
+        with self._lock:
+            self._pending[request_id] = future
+
+        message = json.dumps({"command": list(args), "request_id": request_id})
+        try:
+            with self._send_lock:
+                sock.sendall(message.encode("utf-8") + b"\n")
+        except OSError as e:
+            with self._lock:
+                self._pending.pop(request_id, None)
+            future.set_exception(MpvIPCError(f"send failed: {e}"))
+        return future
+
+    def command(self, *args, timeout: float = 2.0) -> Any:
+        return self.command_async(*args).result(timeout=timeout)
+
+    def set_property(self, name: str, value: Any) -> Future:
+        return self.command_async("set_property", name, value)
+
+    def observe_property(self, name: str) -> Future:
+        observer_id = next(self._observer_ids)
+        with self._lock:
+            self._observers[observer_id] = name
+        return self.command_async("observe_property", observer_id, name)
+
+    def _read_loop(self, sock: socket.socket):
+        try:
+            for line in sock.makefile("r", encoding="utf-8"):
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    Logger.debug(f"mpv IPC: unparsable line {line!r}")
+                    continue
+                self._dispatch(message)
+        except OSError:
+            pass
+        finally:
+            self._fail_pending(MpvIPCError("connection closed"))
+            if self._sock is sock:
+                self._sock = None
+
+    def _dispatch(self, message: Dict):
+        if "request_id" in message and "event" not in message:
+            with self._lock:
+                future = self._pending.pop(message["request_id"], None)
+            if future is None:
+                return
+            if message.get("error", "success") == "success":
+                future.set_result(message.get("data"))
+            else:
+                future.set_exception(MpvIPCError(message["error"]))
+            return
+
+        event = message.get("event")
+        if event == "property-change":
+            name = message.get("name")
+            value = message.get("data")
+            self.properties[name] = value
+            self._notify(self.on_property, name, value)
+        elif event:
+            self._notify(self.on_event, message)
+
+    def _notify(self, callback: Optional[Callable], *args):
+        if callback is None:
+            return
+        try:
+            callback(*args)
+        except Exception as e:
+            Logger.error(f"mpv IPC callback error: {e}")
+
+    def _fail_pending(self, error: Exception):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(error)
+
+    def close(self):
+        sock, self._sock = self._sock, None
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            sock.close()
+        self._fail_pending(MpvIPCError("client closed"))
@@ -0,0 +1,307 @@
+import glob
+import itertools
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from kivy.logger import Logger
+
+from app_config import get_cache_dir
+
+try:
+    from yt_dlp.utils import DownloadCancelled
+except ImportError:  # yt-dlp is only needed once a download runs
+    DownloadCancelled = Exception
+
+DEFAULT_DISK_BUDGET = 2 * 1024 * 1024 * 1024
+
+# Lower values are downloaded first
+PRIORITY_WATCH_LATER = 0
+PRIORITY_HISTORY = 10
+
+# While ``is_busy`` reports the network in use, downloads wait this long
+# before checking again.
+BUSY_RETRY = 5
+
+# Leftovers of downloads interrupted by a shutdown
+PARTIAL_PATTERNS = ("*.part", "*.ytdl", "*.part-Frag*")
+
+
+class DownloadPreempted(DownloadCancelled):
+    """Raised from the progress hook to stop a download for a stream.
+
+    yt-dlp re-raises ``DownloadCancelled`` even with ``ignoreerrors`` set,
+    so a preemption is not logged as a failed download.
+    """
+
+
+class OfflineCache:
+    """Size-bounded LRU directory of downloaded videos.
+
+    Videos are downloaded one at a time on a background thread, in priority
+    order, with the format chosen by ``select_format`` (a yt-dlp format
+    selector callable). When the directory grows past ``max_bytes`` the least
+    recently played videos are deleted. The watch-later list is stored in
+    the same index, and entries not yet downloaded are queued again on
+    startup. Downloads are held back while
+    ``is_busy`` returns true, so they do not compete with a stream. A running
+    download is interrupted when a stream starts and requeued; yt-dlp resumes
+    its partial file later.
+    """
+
+    def __init__(
+        self,
+        ydl_opts: Dict,
+        select_format: Optional[Callable] = None,
+        directory: Optional[str] = None,
+        max_bytes: int = DEFAULT_DISK_BUDGET,
+        is_busy: Optional[Callable[[], bool]] = None,
+    ):
+        self.directory = directory or get_cache_dir("videos")
+        self.max_bytes = max_bytes
+        self.is_busy = is_busy
+        self.ydl_opts = dict(ydl_opts)
+        self.ydl_opts.setdefault("cachedir", get_cache_dir("yt-dlp"))
+        self.ydl_opts.update(
+            {
+                "outtmpl": os.path.join(self.directory, "%(id)s.%(ext)s"),
+                "noprogress": True,
+                "continuedl": True,
+                "progress_hooks": [self._yield_to_stream],
+            }
+        )
+        if select_format is not None:
+            self.ydl_opts["format"] = select_format
+
+        self._jobs: "queue.PriorityQueue" = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._pending = set()
+        self._downloading: Optional[str] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(
+            os.path.join(self.directory, "index.sqlite3"), check_same_thread=False
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS videos ("
+            " video_id TEXT PRIMARY KEY,"
+            " path TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS watch_later ("
+            " video_id TEXT PRIMARY KEY,"
+            " data TEXT NOT NULL,"
+            " added_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+        self._remove_partial_downloads()
+        self._evict()
+        self._resume_watch_later()
+
+    def get(self, video_id: str) -> Optional[str]:
+        """Path of the downloaded video, marking it as recently used."""
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT path FROM videos WHERE video_id = ?", (video_id,)
+                ).fetchone()
+                if not row:
+                    return None
+                if not os.path.exists(row[0]):
+                    self._conn.execute(
+                        "DELETE FROM videos WHERE video_id = ?", (video_id,)
+                    )
+                    self._conn.commit()
+                    return None
+                self._conn.execute(
+                    "UPDATE videos SET last_used = ? WHERE video_id = ?",
+                    (time.time(), video_id),
+                )
+                self._conn.commit()
+                return row[0]
+        except sqlite3.Error as e:
+            Logger.error(f"Offline cache read error: {e}")
+            return None
+
+    def enqueue(self, video_id: str, priority: int = PRIORITY_HISTORY):
+        with self._lock:
+            if video_id in self._pending or video_id == self._downloading:
+                return
+            known = self._conn.execute(
+                "SELECT 1 FROM videos WHERE video_id = ?", (video_id,)
+            ).fetchone()
+            if known:
+                return
+            self._pending.add(video_id)
+            self._jobs.put((priority, next(self._sequence), video_id))
+            self._ensure_worker()
+
+    def add_watch_later(self, video_data: Dict):
+        video_id = video_data["video_id"]
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO watch_later (video_id, data, added_at)"
+                    " VALUES (?, ?, ?)",
+                    (video_id, json.dumps(video_data), time.time()),
+                )
+                self._conn.commit()
+        except sqlite3.Error as e:
+            Logger.error(f"Offline cache write error: {e}")
+            return
+        self.enqueue(video_id, priority=PRIORITY_WATCH_LATER)
+
+    def remove_watch_later(self, video_id: str):
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "DELETE FROM watch_later WHERE video_id = ?", (video_id,)
+                )
+                self._conn.commit()
+        except sqlite3.Error as e:
+            Logger.error(f"Offline cache write error: {e}")
+
+    def watch_later(self) -> List[Dict]:
+        try:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT data FROM watch_later ORDER BY added_at"
+                ).fetchall()
+        except sqlite3.Error as e:
+            Logger.error(f"Offline cache read error: {e}")
+            return []
+        return [json.loads(row[0]) for row in rows]
+
+    def _resume_watch_later(self):
+        # The job queue is in memory; pick up saved videos a restart dropped
+        try:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT video_id FROM watch_later"
+                    " WHERE video_id NOT IN (SELECT video_id FROM videos)"
+                    " ORDER BY added_at"
+                ).fetchall()
+        except sqlite3.Error as e:
+            Logger.error(f"Offline cache read error: {e}")
+            return
+        for (video_id,) in rows:
+            self.enqueue(video_id, priority=PRIORITY_WATCH_LATER)
+
+    def _ensure_worker(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self._run, name="offline-cache", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        try:
+            import yt_dlp
+
+            ydl = yt_dlp.YoutubeDL(self.ydl_opts)
+        except Exception as e:
+            Logger.error(f"OfflineCache: yt-dlp unavailable: {e}")
+            return
+
+        while True:
+            priority, _, video_id = self._jobs.get()
+            if video_id is None:
+                return
+
+            while self.is_busy and self.is_busy():
+                time.sleep(BUSY_RETRY)
+
+            with self._lock:
+                self._pending.discard(video_id)
+                self._downloading = video_id
+            preempted = False
+            try:
+                self._download(ydl, video_id)
+            except DownloadPreempted:
+                preempted = True
+            except Exception as e:
+                Logger.error(f"OfflineCache: download of {video_id} failed: {e}")
+            finally:
+                with self._lock:
+                    self._downloading = None
+
+            if preempted:
+                Logger.info(f"OfflineCache: pausing {video_id} for a stream")
+                self.enqueue(video_id, priority)
+                continue
+            self._evict()
+
+    def _yield_to_stream(self, progress: Dict):
+        # yt-dlp progress hook; raising aborts the download in progress
+        if progress.get("status") == "downloading" and self.is_busy and self.is_busy():
+            raise DownloadPreempted()
+
+    def _download(self, ydl, video_id: str):
+        Logger.info(f"OfflineCache: downloading {video_id}")
+        info = ydl.extract_info(
+            f"https://www.youtube.com/watch?v={video_id}", download=True
+        )
+        if not info:
+            return
+
+        downloads = info.get("requested_downloads") or []
+        path = downloads[0].get("filepath") if downloads else None
+        path = path or ydl.prepare_filename(info)
+        if not os.path.exists(path):
+            Logger.warning(f"OfflineCache: {video_id} missing after download")
+            return
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO videos (video_id, path, size, last_used)"
+                " VALUES (?, ?, ?, ?)",
+                (video_id, path, os.path.getsize(path), time.time()),
+            )
+            self._conn.commit()
+        Logger.info(f"OfflineCache: saved {video_id}")
+
+    def _evict(self):
+        try:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT video_id, path, size FROM videos ORDER BY last_used DESC"
+                ).fetchall()
+                total = 0
+                for video_id, path, size in rows:
+                    total += size
+                    if total <= self.max_bytes:
+                        continue
+                    Logger.info(f"OfflineCache: evicting {video_id}")
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+                    except OSError as e:
+                        Logger.warning(f"OfflineCache: could not delete {path}: {e}")
+                        continue
+                    self._conn.execute(
+                        "DELETE FROM videos WHERE video_id = ?", (video_id,)
+                    )
+                self._conn.commit()
+        except sqlite3.Error as e:
+            Logger.error(f"Offline cache eviction error: {e}")
+
+    def _remove_partial_downloads(self):
+        for pattern in PARTIAL_PATTERNS:
+            for path in glob.glob(os.path.join(self.directory, pattern)):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def shutdown(self):
+        self._jobs.put((float("inf"), next(self._sequence), None))
+        with self._lock:
+            self._conn.close()
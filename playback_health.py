@@ -0,0 +1,137 @@
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+from kivy.logger import Logger
+
+# Resolution steps and the bitrate (bits/s) each needs to play smoothly
+QUALITY_LADDER = (
+    (2160, 16_000_000),
+    (1440, 9_000_000),
+    (1080, 5_000_000),
+    (720, 2_500_000),
+    (480, 1_200_000),
+    (360, 700_000),
+    (240, 400_000),
+    (144, 200_000),
+)
+
+# Required bitrate is multiplied by this to leave room for throughput dips
+BANDWIDTH_HEADROOM = 1.5
+
+# Weight of the newest sample in the throughput moving average
+THROUGHPUT_SMOOTHING = 0.3
+
+# A downgrade is suggested when at least this share of frames was dropped
+# over the last DROP_WINDOW seconds, with at least MIN_WINDOW_FRAMES decoded.
+DROP_RATIO_THRESHOLD = 0.1
+DROP_WINDOW = 10
+MIN_WINDOW_FRAMES = 100
+
+
+def step_below(height: int) -> Optional[int]:
+    for step, _ in QUALITY_LADDER:
+        if step < height:
+            return step
+    return None
+
+
+class PlaybackHealth:
+    """Estimates network throughput and decoder health during playback.
+
+    Fed with the player's input bitrate and frame counters and with timed
+    downloads, it recommends the height cap for the next stream and reports
+    when the current stream is dropping frames badly enough to step down.
+
+    Only rates measured while the network was the bottleneck lower the
+    estimate. Once the player's buffer is full, it reads no faster than the
+    stream's bitrate. Those rates only show that the link kept up, so
+    ``record_consumption`` can raise the estimate but never lower it.
+    """
+
+    def __init__(self):
+        self.throughput: Optional[float] = None
+        self.decode_ceiling: Optional[int] = None
+        self._frame_samples = deque()
+        self._last_counters = None
+        self._lock = threading.Lock()
+
+    def record_throughput(self, bits_per_second: float):
+        if bits_per_second <= 0:
+            return
+        with self._lock:
+            if self.throughput is None:
+                self.throughput = bits_per_second
+            else:
+                self.throughput += THROUGHPUT_SMOOTHING * (
+                    bits_per_second - self.throughput
+                )
+
+    def record_consumption(self, bits_per_second: float):
+        """Record the rate the player read the current stream at."""
+        with self._lock:
+            if self.throughput is not None and bits_per_second > self.throughput:
+                self.throughput = bits_per_second
+
+    def record_download(self, num_bytes: int, seconds: float):
+        if seconds > 0:
+            self.record_throughput(num_bytes * 8 / seconds)
+
+    def record_frames(self, displayed: int, lost: int):
+        """Record the player's cumulative displayed/lost picture counters."""
+        now = time.monotonic()
+        with self._lock:
+            if self._last_counters is not None:
+                last_displayed, last_lost = self._last_counters
+                if displayed >= last_displayed and lost >= last_lost:
+                    self._frame_samples.append(
+                        (now, displayed - last_displayed, lost - last_lost)
+                    )
+            self._last_counters = (displayed, lost)
+
+            while self._frame_samples and now - self._frame_samples[0][0] > DROP_WINDOW:
+                self._frame_samples.popleft()
+
+    def start_stream(self):
+        with self._lock:
+            self._frame_samples.clear()
+            self._last_counters = None
+
+    def drop_ratio(self) -> Optional[float]:
+        with self._lock:
+            displayed = sum(sample[1] for sample in self._frame_samples)
+            lost = sum(sample[2] for sample in self._frame_samples)
+        total = displayed + lost
+        if total < MIN_WINDOW_FRAMES:
+            return None
+        return lost / total
+
+    def should_downgrade(self) -> bool:
+        ratio = self.drop_ratio()
+        return ratio is not None and ratio >= DROP_RATIO_THRESHOLD
+
+    def register_downgrade(self, current_height: int) -> Optional[int]:
+        """Lower the decode ceiling below ``current_height``; returns the new cap."""
+        lower = step_below(current_height)
+        if lower is None:
+            return None
+        with self._lock:
+            self.decode_ceiling = lower
+            self._frame_samples.clear()
+        Logger.info(f"PlaybackHealth: frames dropping, capping quality at {lower}p")
+        return lower
+
+    def recommended_max_height(self, configured: int) -> int:
+        cap = configured
+        if self.decode_ceiling is not None:
+            cap = min(cap, self.decode_ceiling)
+
+        throughput = self.throughput
+        if throughput is None:
+            return cap
+
+        for height, bitrate in QUALITY_LADDER:
+            if height <= cap and bitrate * BANDWIDTH_HEADROOM <= throughput:
+                return height
+        return min(cap, QUALITY_LADDER[-1][0])
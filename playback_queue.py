@@ -0,0 +1,33 @@
+import threading
+from typing import Dict, List, Optional
+
+
+class PlaybackQueue:
+    """Up-next list of videos following the one being played."""
+
+    def __init__(self):
+        self._items: List[Dict] = []
+        self._lock = threading.Lock()
+
+    def set_up_next(self, videos: List[Dict], current_video_id: str):
+        """Queue the videos after ``current_video_id`` in a result list."""
+        ids = [video.get("video_id") for video in videos]
+        start = ids.index(current_video_id) + 1 if current_video_id in ids else 0
+        with self._lock:
+            self._items = [video for video in videos[start:] if video.get("video_id")]
+
+    def peek_next(self) -> Optional[Dict]:
+        with self._lock:
+            return self._items[0] if self._items else None
+
+    def advance(self) -> Optional[Dict]:
+        with self._lock:
+            return self._items.pop(0) if self._items else None
+
+    def clear(self):
+        with self._lock:
+            self._items = []
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._items)
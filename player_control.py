@@ -0,0 +1,125 @@
+import re
+import threading
+from collections import deque
+from concurrent.futures import Future
+from typing import Dict, Optional
+
+from kivy.logger import Logger
+
+from http_transport import HTTPTransport, get_transport
+
+VLC_HTTP_URL = "http://localhost:8080/requests/status.xml"
+VLC_HTTP_AUTH = ("", "raspytube")
+
+# Commands where only the most recent value matters; a newer one replaces a
+# queued older one instead of being sent after it.
+COALESCED_COMMANDS = ("seek", "volume")
+
+
+class VlcControlChannel:
+    """Ordered, non-blocking command queue for VLC's HTTP interface.
+
+    Commands are sent one at a time on a worker thread over the transport's
+    keep-alive session. While a ``seek`` or ``volume`` is still queued, a
+    newer one of the same kind overwrites its value in place, so dragging a
+    slider sends only the final value.
+    """
+
+    def __init__(
+        self,
+        url: str = VLC_HTTP_URL,
+        auth=VLC_HTTP_AUTH,
+        transport: Optional[HTTPTransport] = None,
+    ):
+        self.url = url
+        self.auth = auth
+        self.transport = transport or get_transport()
+        self._queue = deque()
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    def send(self, command: str, val=None, **extra) -> Future:
+        params: Dict = {"command": command, **extra}
+        if val is not None:
+            params["val"] = val
+
+        with self._condition:
+            if command in COALESCED_COMMANDS:
+                for queued in self._queue:
+                    if queued[0]["command"] == command:
+                        queued[0].update(params)
+                        return queued[1]
+
+            future = Future()
+            self._queue.append((params, future))
+            self._ensure_worker()
+            self._condition.notify()
+            return future
+
+    def _ensure_worker(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._closed = False
+            self._thread = threading.Thread(
+                target=self._run, name="vlc-control", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._queue and not self._closed:
+                    self._condition.wait()
+                if self._closed and not self._queue:
+                    return
+                params, future = self._queue.popleft()
+
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            try:
+                response = self.transport.get(
+                    self.url, params=params, auth=self.auth, timeout=1, retry=False
+                )
+                response.content
+                response.raise_for_status()
+                future.set_result(response.status_code)
+            except Exception as e:
+                Logger.error(f"VLC {params['command']} failed: {e}")
+                future.set_exception(e)
+
+    def clear(self):
+        with self._condition:
+            while self._queue:
+                _, future = self._queue.popleft()
+                future.cancel()
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+
+
+# Only these status.xml elements are read; the rest of the document (notably
+# the per-stream metadata) is skipped without building a tree.
+VLC_STATUS_FIELDS = (
+    "time",
+    "length",
+    "position",
+    "state",
+    "currentplid",
+    "inputbitrate",
+    "displayedpictures",
+    "lostpictures",
+)
+_VLC_STATUS_PATTERN = re.compile(r"<(%s)>([^<]*)</\1>" % "|".join(VLC_STATUS_FIELDS))
+
+
+def parse_vlc_status(text: str) -> Dict[str, str]:
+    """Pull the playback fields out of VLC's ``status.xml`` in one scan."""
+    fields: Dict[str, str] = {}
+    for match in _VLC_STATUS_PATTERN.finditer(text):
+        fields.setdefault(match.group(1), match.group(2).strip())
+        if len(fields) == len(VLC_STATUS_FIELDS):
+            break
+    return fields
@@ -0,0 +1,107 @@
+import re
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+from kivy.logger import Logger
+
+DEFAULT_MAX_LINES = 500
+
+# (event type, pattern); the first group, when present, becomes the value
+OUTPUT_PATTERNS = (
+    ("dropped_frames", re.compile(r"picture is too late to be displayed")),
+    ("dropped_frames", re.compile(r"Dropped:\s*(\d+)")),
+    ("buffering", re.compile(r"[Bb]uffering\D*(\d+)\s*%")),
+    ("buffering", re.compile(r"\(Buffering\)|paused for cache")),
+    ("hwdec", re.compile(r"Using hardware decoding \(([^)]+)\)")),
+    ("hwdec", re.compile(r"[Uu]sing (\S+) for hardware decoding")),
+    ("codec", re.compile(r"using (?:video )?decoder module \"?([\w-]+)\"?")),
+    ("codec", re.compile(r"\(\+\) Video --vid=\d+.*?\((\w+)")),
+    ("http_rejected", re.compile(r"HTTP(?:/[\d.]+)?\D{0,12}(403|410)\b")),
+    ("error", re.compile(r"\b(?:error|failed)\b", re.IGNORECASE)),
+)
+
+
+class PlayerOutput:
+    """Continuously drains a player's stdout and stderr.
+
+    Unread pipes fill up and then block the player on write, stalling
+    playback, so each stream gets a reader thread. The newest lines are kept
+    in a bounded ring buffer for diagnostics and recognised lines are turned
+    into ``{"type", "value", "line", "time"}`` events.
+    """
+
+    def __init__(
+        self,
+        max_lines: int = DEFAULT_MAX_LINES,
+        on_event: Optional[Callable[[Dict], None]] = None,
+    ):
+        self.on_event = on_event
+        self._lines = deque(maxlen=max_lines)
+        self._lock = threading.Lock()
+        self.dropped_frame_reports = 0
+
+    def attach(self, process):
+        for name in ("stdout", "stderr"):
+            stream = getattr(process, name, None)
+            if stream is not None:
+                threading.Thread(
+                    target=self._drain,
+                    args=(stream, name),
+                    name=f"player-{name}",
+                    daemon=True,
+                ).start()
+
+    def _drain(self, stream, name: str):
+        try:
+            for raw in iter(stream.readline, b""):
+                line = raw.decode("utf-8", errors="replace").rstrip()
+                if line:
+                    self._handle_line(name, line)
+        except (OSError, ValueError):
+            pass
+        finally:
+            try:
+                stream.close()
+            except OSError:
+                pass
+
+    def _handle_line(self, stream_name: str, line: str):
+        with self._lock:
+            self._lines.append(f"[{stream_name}] {line}")
+
+        event = self.parse_line(line)
+        if event is None:
+            return
+
+        if event["type"] == "dropped_frames":
+            self.dropped_frame_reports += 1
+        if self.on_event:
+            try:
+                self.on_event(event)
+            except Exception as e:
+                Logger.error(f"Player output event handler error: {e}")
+
+    @staticmethod
+    def parse_line(line: str) -> Optional[Dict]:
+        for event_type, pattern in OUTPUT_PATTERNS:
+            match = pattern.search(line)
+            if match:
+                value = match.group(1) if match.groups() else None
+                return {
+                    "type": event_type,
+                    "value": value,
+                    "line": line,
+                    "time": time.time(),
+                }
+        return None
+
+    def recent_lines(self, count: int = 50) -> List[str]:
+        with self._lock:
+            return list(self._lines)[-count:]
+
+    def clear(self):
+        with self._lock:
+            self._lines.clear()
+        self.dropped_frame_reports = 0
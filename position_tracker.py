@@ -0,0 +1,142 @@
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from kivy.logger import Logger
+
+# Poll interval right after a load or seek, when the position is in flux
+FAST_INTERVAL = 0.25
+FAST_PERIOD = 2.0
+
+# Steady playback backs off towards MAX_INTERVAL while samples keep
+# agreeing with the interpolated position.
+BACKOFF_FACTOR = 1.5
+MAX_INTERVAL = 5.0
+PAUSED_INTERVAL = 2.0
+
+# Seconds of disagreement between a sample and the interpolated position
+# that count as a stall, jump or rate change and reset to fast polling.
+DRIFT_TOLERANCE = 0.75
+
+# Poll fast over the last seconds of a video so its end is noticed promptly
+NEAR_END = 3.0
+
+
+class PositionTracker:
+    """Adaptive playback position tracker.
+
+    ``sample`` is polled for ``{"position", "total", "state"}``; between
+    samples the position is interpolated from the wall clock while playing.
+    Polling is fast after ``notify_seek`` and backs off during steady
+    playback. ``on_second`` fires only when the displayed whole second (or
+    the total) changes.
+    """
+
+    def __init__(
+        self,
+        sample: Callable[[], Optional[Dict]],
+        on_second: Callable[[int, int], None],
+    ):
+        self.sample = sample
+        self.on_second = on_second
+        self.interval = FAST_INTERVAL
+        self.total = 0
+        self.playing = False
+        self._anchor_position: Optional[float] = None
+        self._anchor_time = 0.0
+        self._fast_until = time.monotonic() + FAST_PERIOD
+        self._next_poll = 0.0
+        self._displayed = None
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+
+    def position(self) -> Optional[float]:
+        with self._lock:
+            if self._anchor_position is None:
+                return None
+            if not self.playing:
+                return self._anchor_position
+            return self._anchor_position + time.monotonic() - self._anchor_time
+
+    def notify_seek(self):
+        """Poll quickly for a while, e.g. after a seek, pause or new video."""
+        now = time.monotonic()
+        with self._lock:
+            self._fast_until = now + FAST_PERIOD
+            self.interval = FAST_INTERVAL
+            self._next_poll = now
+        self._wake.set()
+
+    def start(self, is_alive: Callable[[], bool]):
+        threading.Thread(
+            target=self._run, args=(is_alive,), name="position-tracker", daemon=True
+        ).start()
+
+    def stop(self):
+        self._stopped.set()
+        self._wake.set()
+
+    def _run(self, is_alive: Callable[[], bool]):
+        while not self._stopped.is_set() and is_alive():
+            if time.monotonic() >= self._next_poll:
+                self._poll()
+
+            self._dispatch_if_changed()
+
+            wait = self._next_poll - time.monotonic()
+            position = self.position()
+            if self.playing and position is not None:
+                # Wake up just after the displayed second rolls over
+                wait = min(wait, 1.0 - (position % 1.0) + 0.01)
+
+            self._wake.wait(max(0.01, wait))
+            self._wake.clear()
+
+    def _poll(self):
+        try:
+            sample = self.sample()
+        except Exception as e:
+            Logger.debug(f"Position tracker sample error: {e}")
+            sample = None
+
+        now = time.monotonic()
+        if not sample:
+            with self._lock:
+                self.interval = min(self.interval * BACKOFF_FACTOR, MAX_INTERVAL)
+                self._next_poll = now + self.interval
+            return
+
+        predicted = self.position()
+        actual = float(sample.get("position", 0))
+        playing = sample.get("state") == "playing"
+
+        with self._lock:
+            self._anchor_position = actual
+            self._anchor_time = now
+            self.playing = playing
+            self.total = int(sample.get("total") or 0)
+
+            drifted = predicted is None or abs(predicted - actual) > DRIFT_TOLERANCE
+            if now < self._fast_until:
+                self.interval = FAST_INTERVAL
+            elif not playing:
+                self.interval = PAUSED_INTERVAL
+            elif drifted:
+                self.interval = FAST_INTERVAL
+            else:
+                self.interval = min(self.interval * BACKOFF_FACTOR, MAX_INTERVAL)
+            if playing and self.total:
+                remaining = self.total - actual - NEAR_END
+                self.interval = max(FAST_INTERVAL, min(self.interval, remaining))
+            self._next_poll = now + self.interval
+
+    def _dispatch_if_changed(self):
+        position = self.position()
+        if position is None:
+            return
+
+        displayed = (int(position), self.total)
+        if displayed != self._displayed:
+            self._displayed = displayed
+            self.on_second(*displayed)
@@ -0,0 +1,128 @@
+import json
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+import requests
+from kivy.logger import Logger
+
+from app_config import get_cache_dir
+
+# YouTube Data API v3 unit costs per call
+ENDPOINT_COSTS = {
+    "search": 100,
+    "videos": 1,
+}
+DEFAULT_COST = 1
+DEFAULT_DAILY_QUOTA = 10000
+
+# Below this many remaining units the API switches to cache-first mode.
+DEFAULT_LOW_WATERMARK = 1000
+
+try:
+    from zoneinfo import ZoneInfo
+
+    PACIFIC = ZoneInfo("America/Los_Angeles")
+except Exception:
+    PACIFIC = None
+
+
+class QuotaExceededError(requests.RequestException):
+    pass
+
+
+def quota_day() -> str:
+    """The current quota day; YouTube resets quotas at midnight Pacific time."""
+    if PACIFIC is not None:
+        now = datetime.now(PACIFIC)
+    else:
+        # No tz database available: approximate with PST
+        now = datetime.now(timezone.utc) - timedelta(hours=8)
+    return now.date().isoformat()
+
+
+class QuotaLedger:
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        daily_quota: int = DEFAULT_DAILY_QUOTA,
+        low_watermark: int = DEFAULT_LOW_WATERMARK,
+        costs: Optional[Dict[str, int]] = None,
+    ):
+        self.path = path or os.path.join(get_cache_dir(), "quota.json")
+        self.daily_quota = daily_quota
+        self.low_watermark = low_watermark
+        self.costs = dict(ENDPOINT_COSTS)
+        if costs:
+            self.costs.update(costs)
+        self._lock = threading.Lock()
+        self.day = quota_day()
+        self.used = 0
+        self.by_endpoint: Dict[str, int] = {}
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r") as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            Logger.warning(f"Could not read quota ledger: {e}")
+            return
+
+        if state.get("day") == self.day:
+            self.used = int(state.get("used", 0))
+            self.by_endpoint = dict(state.get("by_endpoint", {}))
+
+    def _save(self):
+        state = {"day": self.day, "used": self.used, "by_endpoint": self.by_endpoint}
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            Logger.warning(f"Could not write quota ledger: {e}")
+
+    def _roll_over(self):
+        today = quota_day()
+        if today != self.day:
+            Logger.info(f"Quota: new quota day {today}, resetting ledger")
+            self.day = today
+            self.used = 0
+            self.by_endpoint = {}
+            self._save()
+
+    def cost(self, endpoint: str) -> int:
+        return self.costs.get(endpoint, DEFAULT_COST)
+
+    @property
+    def remaining(self) -> int:
+        with self._lock:
+            self._roll_over()
+            return max(0, self.daily_quota - self.used)
+
+    def is_low(self) -> bool:
+        return self.remaining < self.low_watermark
+
+    def can_afford(self, endpoint: str) -> bool:
+        return self.remaining >= self.cost(endpoint)
+
+    def charge(self, endpoint: str):
+        cost = self.cost(endpoint)
+        with self._lock:
+            self._roll_over()
+            self.used += cost
+            self.by_endpoint[endpoint] = self.by_endpoint.get(endpoint, 0) + cost
+            self._save()
+
+    def mark_exhausted(self):
+        """Record that the API reported the quota as spent for today."""
+        with self._lock:
+            self._roll_over()
+            if self.used < self.daily_quota:
+                Logger.warning("Quota: API reports daily quota exceeded")
+                self.used = self.daily_quota
+                self._save()
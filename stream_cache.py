@@ -0,0 +1,135 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Optional
+from urllib.parse import parse_qs, urlsplit
+
+from kivy.logger import Logger
+
+from app_config import get_cache_dir
+
+# Used when a resolved URL carries no expire= timestamp
+DEFAULT_STREAM_TTL = 60 * 60
+
+# Treat URLs as expired this many seconds early so playback does not start
+# on a URL that dies mid-stream.
+EXPIRY_MARGIN = 10 * 60
+
+_PATH_EXPIRE_RE = re.compile(r"/expire/(\d+)")
+
+
+def parse_stream_expiry(url: str) -> Optional[float]:
+    """Return the ``expire`` timestamp embedded in a googlevideo URL."""
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return None
+
+    values = parse_qs(parts.query).get("expire")
+    if values and values[0].isdigit():
+        return float(values[0])
+
+    # Manifest URLs carry their parameters as path segments
+    match = _PATH_EXPIRE_RE.search(parts.path)
+    if match:
+        return float(match.group(1))
+
+    return None
+
+
+class StreamCache:
+    def __init__(self, path: Optional[str] = None, margin: int = EXPIRY_MARGIN):
+        self.path = path or os.path.join(get_cache_dir(), "stream_cache.sqlite3")
+        self.margin = margin
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS streams ("
+            " video_id TEXT NOT NULL,"
+            " format_pref TEXT NOT NULL,"
+            " url TEXT NOT NULL,"
+            " expires_at REAL NOT NULL,"
+            " PRIMARY KEY (video_id, format_pref))"
+        )
+        self._conn.commit()
+        self.purge()
+
+    def get(self, video_id: str, format_pref: str) -> Optional[str]:
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT url, expires_at FROM streams"
+                    " WHERE video_id = ? AND format_pref = ?",
+                    (video_id, format_pref),
+                ).fetchone()
+        except sqlite3.Error as e:
+            Logger.error(f"Stream cache read error: {e}")
+            return None
+
+        if not row:
+            return None
+
+        url, expires_at = row
+        if expires_at - self.margin <= time.time():
+            self.invalidate(video_id, format_pref)
+            return None
+        return url
+
+    def put(self, video_id: str, format_pref: str, url: str):
+        expires_at = parse_stream_expiry(url) or time.time() + DEFAULT_STREAM_TTL
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO streams"
+                    " (video_id, format_pref, url, expires_at) VALUES (?, ?, ?, ?)",
+                    (video_id, format_pref, url, expires_at),
+                )
+                self._conn.commit()
+        except sqlite3.Error as e:
+            Logger.error(f"Stream cache write error: {e}")
+
+    def invalidate(self, video_id: str, format_pref: Optional[str] = None):
+        try:
+            with self._lock:
+                if format_pref is None:
+                    self._conn.execute(
+                        "DELETE FROM streams WHERE video_id = ?", (video_id,)
+                    )
+                else:
+                    self._conn.execute(
+                        "DELETE FROM streams WHERE video_id = ? AND format_pref = ?",
+                        (video_id, format_pref),
+                    )
+                self._conn.commit()
+        except sqlite3.Error as e:
+            Logger.error(f"Stream cache write error: {e}")
+
+    def invalidate_url(self, url: str) -> Optional[str]:
+        """Drop a URL the server refused; returns the video it belonged to."""
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT video_id FROM streams WHERE url = ?", (url,)
+                ).fetchone()
+                self._conn.execute("DELETE FROM streams WHERE url = ?", (url,))
+                self._conn.commit()
+        except sqlite3.Error as e:
+            Logger.error(f"Stream cache write error: {e}")
+            return None
+        return row[0] if row else None
+
+    def purge(self):
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "DELETE FROM streams WHERE expires_at < ?", (time.time(),)
+                )
+                self._conn.commit()
+        except sqlite3.Error as e:
+            Logger.error(f"Stream cache purge error: {e}")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,491 @@
+import mmap
+import re
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional, Tuple
+
+import requests
+from kivy.logger import Logger
+
+from http_transport import HTTPTransport, get_transport
+
+DEFAULT_BUFFER_SIZE = 32 * 1024 * 1024
+
+# googlevideo throttles long unranged downloads, so the stream is fetched as
+# a series of ranged requests of this size.
+RANGE_CHUNK = 2 * 1024 * 1024
+READ_CHUNK = 64 * 1024
+
+# Share of the ring kept behind the player's read position so short
+# backward seeks are served from memory.
+BACK_BUFFER_SHARE = 0.25
+
+# A seek at most this far past the buffered data waits for the fetcher
+# instead of restarting it at the new offset.
+SEEK_AHEAD_TOLERANCE = 1024 * 1024
+
+# The playing stream plus one buffering ahead for the next video
+MAX_STREAMS = 2
+
+MAX_FETCH_FAILURES = 5
+# googlevideo answers these once a URL has expired or the client IP changed;
+# retrying the same URL cannot succeed
+REJECTED_STATUSES = (403, 410)
+HEADER_TIMEOUT = 15
+READ_TIMEOUT = 30
+
+_RANGE_RE = re.compile(r"bytes=(\d+)-(\d*)")
+_CONTENT_RANGE_RE = re.compile(r"bytes \d+-\d+/(\d+)")
+
+
+class RingBuffer:
+    """A fixed-size window ``[start, end)`` over a byte stream.
+
+    Bytes live in an anonymous memory map; appending past the capacity
+    overwrites the oldest bytes. Not thread-safe on its own.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.start = 0
+        self.end = 0
+        self._map = mmap.mmap(-1, capacity)
+
+    def reset(self, offset: int):
+        self.start = self.end = offset
+
+    def contains(self, offset: int) -> bool:
+        return self.start <= offset < self.end
+
+    def write(self, data: bytes):
+        size = len(data)
+        if size > self.capacity:
+            data = data[-self.capacity :]
+            self.end += size - self.capacity
+            size = self.capacity
+
+        pos = self.end % self.capacity
+        first = min(size, self.capacity - pos)
+        self._map[pos : pos + first] = data[:first]
+        if first < size:
+            self._map[0 : size - first] = data[first:]
+
+        self.end += size
+        self.start = max(self.start, self.end - self.capacity)
+
+    def read(self, offset: int, size: int) -> bytes:
+        if not self.contains(offset):
+            return b""
+
+        size = min(size, self.end - offset)
+        pos = offset % self.capacity
+        first = min(size, self.capacity - pos)
+        data = self._map[pos : pos + first]
+        if first < size:
+            data += self._map[0 : size - first]
+        return data
+
+    def close(self):
+        self._map.close()
+
+
+class ProxiedStream:
+    """One upstream stream fetched ahead of the player into a ring buffer."""
+
+    def __init__(
+        self,
+        url: str,
+        buffer_size: int = DEFAULT_BUFFER_SIZE,
+        transport: Optional[HTTPTransport] = None,
+        on_download: Optional[Callable[[int, float], None]] = None,
+        on_rejected: Optional[Callable[[str], None]] = None,
+    ):
+        self.url = url
+        self.transport = transport or get_transport()
+        self.on_download = on_download
+        self.on_rejected = on_rejected
+        self.buffer = RingBuffer(buffer_size)
+        self.total: Optional[int] = None
+        self.content_type = "application/octet-stream"
+        self.error: Optional[Exception] = None
+        self.eof = False
+        self.closed = False
+        self._read_pos = 0
+        self._generation = 0
+        self._newest_reader = 0
+        self._back_reserve = max(READ_CHUNK, int(buffer_size * BACK_BUFFER_SHARE))
+        self._cond = threading.Condition()
+
+    def start(self):
+        threading.Thread(
+            target=self._fetch_loop, name="stream-proxy-fetch", daemon=True
+        ).start()
+
+    def wait_for_size(self, timeout: float = HEADER_TIMEOUT) -> Optional[int]:
+        with self._cond:
+            self._cond.wait_for(
+                lambda: self.total is not None or self.error or self.closed, timeout
+            )
+            return self.total
+
+    def new_reader(self) -> int:
+        """Register a player connection; the newest one steers the fetcher."""
+        with self._cond:
+            self._newest_reader += 1
+            self._cond.notify_all()
+            return self._newest_reader
+
+    def read(
+        self,
+        offset: int,
+        size: int,
+        reader: Optional[int] = None,
+        timeout: float = READ_TIMEOUT,
+    ) -> bytes:
+        """Bytes at ``offset``, blocking until fetched; ``b""`` at the end.
+
+        A ``reader`` from ``new_reader`` that a newer connection has
+        superseded is only served what is already buffered, so a player's
+        abandoned connection cannot pull the fetch back from its seek target.
+        """
+
+        def superseded():
+            return reader is not None and reader != self._newest_reader
+
+        with self._cond:
+            if not superseded():
+                self._seek(offset)
+            self._cond.wait_for(
+                lambda: self.closed
+                or self.error is not None
+                or superseded()
+                or self.buffer.contains(offset)
+                or (self.eof and offset >= self.buffer.end),
+                timeout,
+            )
+            if self.closed or not self.buffer.contains(offset):
+                return b""
+
+            data = self.buffer.read(offset, size)
+            if not superseded():
+                self._read_pos = offset + len(data)
+                self._cond.notify_all()
+            return data
+
+    def _seek(self, offset: int):
+        self._read_pos = offset
+        in_window = (
+            self.buffer.start <= offset <= self.buffer.end + SEEK_AHEAD_TOLERANCE
+        )
+        if in_window and self.error is None:
+            return
+        if self.total is not None and offset >= self.total:
+            return
+
+        Logger.debug(f"StreamProxy: seek outside buffer, refetching from {offset}")
+        self._generation += 1
+        self.buffer.reset(offset)
+        self.eof = False
+        self.error = None
+        self._cond.notify_all()
+
+    def _ahead_full(self) -> bool:
+        return (
+            self.buffer.end - self._read_pos
+            >= self.buffer.capacity - self._back_reserve
+        )
+
+    def _fetch_loop(self):
+        failures = 0
+        while True:
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: self.closed or not (self.eof or self._ahead_full())
+                )
+                if self.closed:
+                    return
+                generation, position = self._generation, self.buffer.end
+
+            try:
+                self._fetch_range(generation, position)
+                failures = 0
+            except requests.RequestException as e:
+                failures += 1
+                Logger.warning(f"StreamProxy: fetch at {position} failed: {e}")
+                status = getattr(e.response, "status_code", None)
+                rejected = status in REJECTED_STATUSES
+                if rejected and self.on_rejected:
+                    self.on_rejected(self.url)
+                if rejected or failures >= MAX_FETCH_FAILURES:
+                    with self._cond:
+                        self.error = e
+                        self._cond.notify_all()
+                        self._cond.wait_for(
+                            lambda: self.closed or self._generation != generation
+                        )
+                    failures = 0
+                else:
+                    time.sleep(0.5 * 2**failures)
+
+    def _fetch_range(self, generation: int, position: int):
+        last = position + RANGE_CHUNK - 1
+        if self.total is not None:
+            last = min(last, self.total - 1)
+
+        # Only time spent waiting on the network counts, not waits for the
+        # player to make room, or throughput would track playback speed
+        started = time.monotonic()
+        received = 0
+        response = self.transport.get(
+            self.url,
+            headers={"Range": f"bytes={position}-{last}"},
+            stream=True,
+            timeout=10,
+        )
+        network_time = time.monotonic() - started
+        try:
+            if response.status_code == 416:
+                with self._cond:
+                    if generation == self._generation:
+                        self.eof = True
+                        self._cond.notify_all()
+                return
+
+            response.raise_for_status()
+            if response.status_code != 206 and position > 0:
+                raise requests.RequestException("upstream ignored the Range header")
+            self._learn_size(response, position)
+
+            chunks = response.iter_content(READ_CHUNK)
+            while True:
+                started = time.monotonic()
+                chunk = next(chunks, None)
+                network_time += time.monotonic() - started
+                if chunk is None:
+                    break
+
+                with self._cond:
+                    self._cond.wait_for(
+                        lambda: self.closed
+                        or generation != self._generation
+                        or not self._ahead_full()
+                    )
+                    if self.closed or generation != self._generation:
+                        return
+                    self.buffer.write(chunk)
+                    self._cond.notify_all()
+                received += len(chunk)
+        finally:
+            response.close()
+            if received and self.on_download:
+                self.on_download(received, network_time)
+
+        with self._cond:
+            if generation == self._generation and self.buffer.end >= (self.total or 0):
+                self.eof = True
+                self._cond.notify_all()
+
+    def _learn_size(self, response: requests.Response, position: int):
+        if self.total is not None:
+            return
+
+        match = _CONTENT_RANGE_RE.match(response.headers.get("Content-Range", ""))
+        if match:
+            total = int(match.group(1))
+        else:
+            total = position + int(response.headers.get("Content-Length", 0))
+
+        with self._cond:
+            self.total = total
+            self.content_type = response.headers.get("Content-Type", self.content_type)
+            self._cond.notify_all()
+
+    def close(self):
+        with self._cond:
+            if self.closed:
+                return
+            self.closed = True
+            self._cond.notify_all()
+            self.buffer.close()
+
+
+class _ProxyRequestHandler(BaseHTTPRequestHandler):
+    server: "_ProxyServer"
+    protocol_version = "HTTP/1.1"
+
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def do_GET(self):
+        self._serve(send_body=True)
+
+    def _serve(self, send_body: bool):
+        stream = self.server.proxy.lookup(self.path)
+        if stream is None:
+            self.send_error(404)
+            return
+
+        total = stream.wait_for_size()
+        if total is None:
+            self.send_error(502, "Upstream unavailable")
+            return
+
+        requested = self._parse_range(total)
+        if requested is None:
+            self.send_response(416)
+            self.send_header("Content-Range", f"bytes */{total}")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        first, last = requested
+        partial = "Range" in self.headers
+        self.send_response(206 if partial else 200)
+        self.send_header("Content-Type", stream.content_type)
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(last - first + 1))
+        if partial:
+            self.send_header("Content-Range", f"bytes {first}-{last}/{total}")
+        self.end_headers()
+        if not send_body:
+            return
+
+        reader = stream.new_reader()
+        position = first
+        try:
+            while position <= last:
+                data = stream.read(
+                    position, min(READ_CHUNK, last - position + 1), reader
+                )
+                if not data:
+                    break
+                self.wfile.write(data)
+                position += len(data)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        if position <= last:
+            # The promised length can no longer be honoured
+            self.close_connection = True
+
+    def _parse_range(self, total: int) -> Optional[Tuple[int, int]]:
+        header = self.headers.get("Range")
+        if not header:
+            return 0, total - 1
+
+        match = _RANGE_RE.match(header.strip())
+        if not match:
+            return 0, total - 1
+
+        first = int(match.group(1))
+        last = int(match.group(2)) if match.group(2) else total - 1
+        if first >= total:
+            return None
+        return first, min(last, total - 1)
+
+    def log_message(self, format, *args):
+        Logger.debug(f"StreamProxy: {format % args}")
+
+
+class _ProxyServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, proxy: "StreamProxy"):
+        super().__init__(("127.0.0.1", 0), _ProxyRequestHandler)
+        self.proxy = proxy
+
+    def handle_error(self, request, client_address):
+        # Players drop connections mid-request on every seek or stop
+        Logger.debug(f"StreamProxy: request failed: {sys.exc_info()[1]!r}")
+
+
+class StreamProxy:
+    """Local read-ahead HTTP proxy between googlevideo and the player.
+
+    ``open(url)`` returns a ``127.0.0.1`` URL for the player. The upstream
+    stream is fetched with ranged requests into a memory-mapped ring buffer
+    ahead of the player's read position, so Wi-Fi hiccups are absorbed by
+    the buffer rather than the player's small network cache. Seeks inside
+    the buffered window are served from memory; others restart the fetch
+    at the new offset. The ``MAX_STREAMS`` most recently opened streams are
+    kept, so the next video can buffer while the current one plays.
+    ``on_rejected`` is called with an upstream URL googlevideo refuses.
+    """
+
+    def __init__(
+        self,
+        buffer_size: int = DEFAULT_BUFFER_SIZE,
+        transport: Optional[HTTPTransport] = None,
+        on_download: Optional[Callable[[int, float], None]] = None,
+        on_rejected: Optional[Callable[[str], None]] = None,
+    ):
+        self.buffer_size = buffer_size
+        self.transport = transport
+        self.on_download = on_download
+        self.on_rejected = on_rejected
+        self._streams: Dict[str, ProxiedStream] = {}
+        self._server: Optional[_ProxyServer] = None
+        self._lock = threading.Lock()
+
+    @property
+    def port(self) -> Optional[int]:
+        return self._server.server_address[1] if self._server else None
+
+    def start(self):
+        with self._lock:
+            if self._server is not None:
+                return
+            self._server = _ProxyServer(self)
+        threading.Thread(
+            target=self._server.serve_forever, name="stream-proxy", daemon=True
+        ).start()
+        Logger.info(f"StreamProxy: listening on 127.0.0.1:{self.port}")
+
+    def open(self, url: str) -> str:
+        self.start()
+        stream = ProxiedStream(
+            url,
+            buffer_size=self.buffer_size,
+            transport=self.transport,
+            on_download=self.on_download,
+            on_rejected=self.on_rejected,
+        )
+        token = uuid.uuid4().hex
+
+        with self._lock:
+            self._streams[token] = stream
+            stale = list(self._streams)[:-MAX_STREAMS]
+            previous = [self._streams.pop(old) for old in stale]
+        for old in previous:
+            old.close()
+
+        stream.start()
+        return f"http://127.0.0.1:{self.port}/stream/{token}"
+
+    def lookup(self, path: str) -> Optional[ProxiedStream]:
+        token = path.rstrip("/").rsplit("/", 1)[-1]
+        with self._lock:
+            return self._streams.get(token)
+
+    def close_stream(self, local_url: str):
+        token = local_url.rstrip("/").rsplit("/", 1)[-1]
+        with self._lock:
+            stream = self._streams.pop(token, None)
+        if stream is not None:
+            stream.close()
+
+    def close_streams(self):
+        with self._lock:
+            streams, self._streams = self._streams, {}
+        for stream in streams.values():
+            stream.close()
+
+    def shutdown(self):
+        self.close_streams()
+        with self._lock:
+            server, self._server = self._server, None
+        if server is not None:
+            server.shutdown()
+            server.server_close()
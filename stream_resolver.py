@@ -0,0 +1,204 @@
+import itertools
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional
+
+from kivy.logger import Logger
+
+from app_config import get_cache_dir
+
+# Lower values are resolved first
+PRIORITY_PLAY = 0
+PRIORITY_SPECULATIVE = 10
+
+
+class StreamResolver:
+    """Resolves playable stream URLs on long-lived worker threads.
+
+    Each worker keeps one warm ``YoutubeDL`` instance, so extractor setup and
+    player-JS signature work (cached under ``cachedir``) are paid once rather
+    than on every play. yt-dlp itself is imported lazily on the workers.
+    """
+
+    def __init__(
+        self,
+        ydl_opts: Dict,
+        select_url: Callable[[Dict], Optional[str]],
+        workers: int = 1,
+    ):
+        self.ydl_opts = dict(ydl_opts)
+        self.ydl_opts.setdefault("cachedir", get_cache_dir("yt-dlp"))
+        self.select_url = select_url
+        self.workers = workers
+        self._jobs: "queue.PriorityQueue" = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._pending: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+
+    def start(self):
+        """Start the workers and warm up their YoutubeDL instances."""
+        with self._lock:
+            if self._threads:
+                return
+            for index in range(self.workers):
+                thread = threading.Thread(
+                    target=self._run, name=f"stream-resolver-{index}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, video_id: str, priority: int = PRIORITY_PLAY) -> Future:
+        self.start()
+        with self._lock:
+            future = self._pending.get(video_id)
+            if future is not None and not future.cancelled():
+                return future
+
+            future = Future()
+            self._pending[video_id] = future
+            self._jobs.put((priority, next(self._sequence), video_id, future))
+            return future
+
+    def resolve(self, video_id: str, timeout: Optional[float] = None) -> Optional[str]:
+        return self.submit(video_id).result(timeout=timeout)
+
+    def _create_ydl(self):
+        import yt_dlp
+
+        ydl = yt_dlp.YoutubeDL(self.ydl_opts)
+        Logger.debug("StreamResolver: YoutubeDL ready")
+        return ydl
+
+    def _run(self):
+        try:
+            ydl = self._create_ydl()
+        except Exception as e:
+            Logger.error(f"StreamResolver: yt-dlp unavailable: {e}")
+            ydl = None
+
+        while True:
+            _, _, video_id, future = self._jobs.get()
+            if future is None:
+                break
+
+            if not future.set_running_or_notify_cancel():
+                self._forget(video_id, future)
+                continue
+
+            try:
+                if ydl is None:
+                    ydl = self._create_ydl()
+                youtube_url = f"https://www.youtube.com/watch?v={video_id}"
+                info = ydl.extract_info(youtube_url, download=False)
+                if not info:
+                    Logger.error(f"No video info extracted for {video_id}")
+                future.set_result(self.select_url(info) if info else None)
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                self._forget(video_id, future)
+
+        if ydl is not None:
+            ydl.close()
+
+    def _forget(self, video_id: str, future: Future):
+        with self._lock:
+            if self._pending.get(video_id) is future:
+                del self._pending[video_id]
+
+    def shutdown(self):
+        with self._lock:
+            for future in self._pending.values():
+                future.cancel()
+            self._pending.clear()
+            threads, self._threads = self._threads, []
+        for _ in threads:
+            self._jobs.put((float("inf"), next(self._sequence), None, None))
+
+
+class PreResolver:
+    """Speculatively resolves streams for the cards on screen.
+
+    Keeps an ordered list of video ids and hands at most ``max_in_flight`` of
+    them to ``start_job`` at a time. ``schedule`` replaces the list, e.g. on a
+    page change, and cancels queued work for ids that are no longer wanted.
+    """
+
+    def __init__(
+        self,
+        start_job: Callable[[str], Optional[Future]],
+        max_in_flight: int = 1,
+    ):
+        self.start_job = start_job
+        self.max_in_flight = max_in_flight
+        self._queue: List[str] = []
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def schedule(self, video_ids: List[str]):
+        wanted = set(video_ids)
+        with self._lock:
+            self._queue = []
+            unwanted = [
+                future
+                for video_id, future in self._in_flight.items()
+                if video_id not in wanted
+            ]
+
+        # Cancelling runs done-callbacks synchronously, so do it unlocked
+        for future in unwanted:
+            future.cancel()
+
+        with self._lock:
+            self._queue = [
+                video_id for video_id in video_ids if video_id not in self._in_flight
+            ]
+        self._pump()
+
+    def prioritize(self, video_id: str):
+        with self._lock:
+            if video_id not in self._queue:
+                return
+            self._queue.remove(video_id)
+            self._queue.insert(0, video_id)
+        self._pump()
+
+    def claim(self, video_id: str):
+        """Stop tracking ``video_id`` so a later ``schedule`` cannot cancel a
+        resolution that playback is now waiting on."""
+        with self._lock:
+            self._in_flight.pop(video_id, None)
+            if video_id in self._queue:
+                self._queue.remove(video_id)
+
+    def cancel(self):
+        self.schedule([])
+
+    def _pump(self):
+        while True:
+            with self._lock:
+                if len(self._in_flight) >= self.max_in_flight or not self._queue:
+                    return
+                video_id = self._queue.pop(0)
+
+            try:
+                future = self.start_job(video_id)
+            except Exception as e:
+                Logger.debug(f"PreResolver: could not start {video_id}: {e}")
+                future = None
+            if future is None:
+                continue
+
+            with self._lock:
+                self._in_flight[video_id] = future
+            future.add_done_callback(
+                lambda f, video_id=video_id: self._on_done(video_id, f)
+            )
+
+    def _on_done(self, video_id: str, future: Future):
+        with self._lock:
+            if self._in_flight.get(video_id) is future:
+                del self._in_flight[video_id]
+        self._pump()
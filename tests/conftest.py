@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Kivy parses sys.argv on import unless told not to
+os.environ.setdefault("KIVY_NO_ARGS", "1")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,129 @@
+import json
+import socket
+import threading
+
+import pytest
+
+from mpv_ipc import MpvIPCClient, MpvIPCError
+
+
+class FakeMpv:
+    """Unix-socket stand-in for mpv that hands each received command to a
+    script and writes back whatever messages it returns."""
+
+    def __init__(self, path, script):
+        self.path = path
+        self.script = script
+        self.received = []
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(path)
+        self._server.listen(1)
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def _serve(self):
+        conn, _ = self._server.accept()
+        with conn:
+            for line in conn.makefile("r", encoding="utf-8"):
+                message = json.loads(line)
+                self.received.append(message)
+                replies = self.script(message, self.received)
+                if replies is None:
+                    # Drop the connection without answering
+                    conn.shutdown(socket.SHUT_RDWR)
+                    return
+                for reply in replies:
+                    conn.sendall(json.dumps(reply).encode("utf-8") + b"\n")
+
+    def close(self):
+        self._server.close()
+
+
+@pytest.fixture
+def socket_path(tmp_path):
+    return str(tmp_path / "mpv.sock")
+
+
+def connect(socket_path, script, **kwargs):
+    server = FakeMpv(socket_path, script)
+    client = MpvIPCClient(socket_path, **kwargs)
+    client.connect(timeout=2)
+    return server, client
+
+
+def test_pipelined_replies_are_matched_by_request_id(socket_path):
+    def script(message, received):
+        # Hold the first command and answer both once the second arrives,
+        # newest first
+        if len(received) < 2:
+            return []
+        return [
+            {"request_id": m["request_id"], "error": "success", "data": m["command"]}
+            for m in reversed(received)
+        ]
+
+    server, client = connect(socket_path, script)
+    first = client.command_async("get_property", "duration")
+    second = client.command_async("get_property", "time-pos")
+
+    assert first.result(timeout=2) == ["get_property", "duration"]
+    assert second.result(timeout=2) == ["get_property", "time-pos"]
+    client.close()
+    server.close()
+
+
+def test_error_reply_raises(socket_path):
+    def script(message, received):
+        return [{"request_id": message["request_id"], "error": "property unavailable"}]
+
+    server, client = connect(socket_path, script)
+    with pytest.raises(MpvIPCError, match="property unavailable"):
+        client.command("get_property", "duration")
+    client.close()
+    server.close()
+
+
+def test_property_changes_and_events_reach_callbacks(socket_path):
+    changes = []
+    events = []
+    done = threading.Event()
+
+    def script(message, received):
+        _, observer_id, name = message["command"]
+        return [
+            {"request_id": message["request_id"], "error": "success"},
+            {"event": "property-change", "id": observer_id, "name": name, "data": 4.5},
+            {"event": "end-file", "reason": "eof"},
+        ]
+
+    def on_event(event):
+        events.append(event)
+        done.set()
+
+    server, client = connect(
+        socket_path,
+        script,
+        on_property=lambda name, value: changes.append((name, value)),
+        on_event=on_event,
+    )
+    client.observe_property("time-pos").result(timeout=2)
+
+    assert done.wait(2)
+    assert changes == [("time-pos", 4.5)]
+    assert client.properties["time-pos"] == 4.5
+    assert events == [{"event": "end-file", "reason": "eof"}]
+    client.close()
+    server.close()
+
+
+def test_disconnect_fails_pending_commands(socket_path):
+    server, client = connect(socket_path, lambda message, received: None)
+    future = client.command_async("loadfile", "video.mp4")
+
+    with pytest.raises(MpvIPCError, match="connection closed"):
+        future.result(timeout=2)
+    client._reader.join(timeout=2)
+    assert not client.connected
+    with pytest.raises(MpvIPCError, match="not connected"):
+        client.command("get_property", "pause")
+    server.close()
@@ -0,0 +1,192 @@
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from stream_proxy import MAX_STREAMS, StreamProxy
+
+CONTENT = bytes(range(256)) * (4 * 1024 * 1024 // 256)
+
+
+class RangedHandler(BaseHTTPRequestHandler):
+    """Serves CONTENT with byte-range support, like googlevideo."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.ranges.append(self.headers.get("Range"))
+        total = len(CONTENT)
+        first, last = 0, total - 1
+        match = re.match(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+        if match:
+            first = int(match.group(1))
+            if match.group(2):
+                last = min(int(match.group(2)), total - 1)
+        if first >= total:
+            self.send_response(416)
+            self.send_header("Content-Range", f"bytes */{total}")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        self.send_response(206 if match else 200)
+        self.send_header("Content-Type", "video/mp4")
+        self.send_header("Content-Length", str(last - first + 1))
+        if match:
+            self.send_header("Content-Range", f"bytes {first}-{last}/{total}")
+        self.end_headers()
+        self.wfile.write(CONTENT[first : last + 1])
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def upstream():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), RangedHandler)
+    server.daemon_threads = True
+    server.ranges = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def upstream_url(upstream):
+    return f"http://127.0.0.1:{upstream.server_address[1]}/video.mp4"
+
+
+@pytest.fixture
+def proxy():
+    proxy = StreamProxy(buffer_size=1024 * 1024)
+    yield proxy
+    proxy.shutdown()
+
+
+def test_full_get(proxy, upstream_url):
+    response = requests.get(proxy.open(upstream_url), timeout=10)
+
+    assert response.status_code == 200
+    assert response.headers["Content-Type"] == "video/mp4"
+    assert response.content == CONTENT
+
+
+def test_ranged_get(proxy, upstream_url):
+    response = requests.get(
+        proxy.open(upstream_url), headers={"Range": "bytes=100-1099"}, timeout=10
+    )
+
+    assert response.status_code == 206
+    assert response.headers["Content-Range"] == f"bytes 100-1099/{len(CONTENT)}"
+    assert response.content == CONTENT[100:1100]
+
+
+def test_far_seek_refetches_from_the_new_offset(proxy, upstream, upstream_url):
+    local_url = proxy.open(upstream_url)
+    assert requests.get(local_url, headers={"Range": "bytes=0-999"}).ok
+
+    offset = 3 * 1024 * 1024
+    response = requests.get(
+        local_url, headers={"Range": f"bytes={offset}-{offset + 999}"}, timeout=10
+    )
+
+    assert response.content == CONTENT[offset : offset + 1000]
+    assert any(r and r.startswith(f"bytes={offset}-") for r in upstream.ranges)
+
+
+def test_superseded_reader_does_not_pull_the_fetch_back(proxy, upstream_url):
+    stream = proxy.lookup(proxy.open(upstream_url))
+    old = stream.new_reader()
+    assert stream.read(0, 1000, old) == CONTENT[:1000]
+
+    # The player seeks far ahead on a new connection while the old one
+    # keeps reading at its previous offsets
+    offset = 3 * 1024 * 1024
+    new = stream.new_reader()
+    result = {}
+    seek = threading.Thread(
+        target=lambda: result.update(data=stream.read(offset, 1000, new, timeout=5))
+    )
+    seek.start()
+    for position in range(1000, 256 * 1024, 1000):
+        stream.read(position, 1000, old, timeout=5)
+    seek.join()
+
+    assert result["data"] == CONTENT[offset : offset + 1000]
+
+
+def test_range_past_the_end_is_416(proxy, upstream_url):
+    response = requests.get(
+        proxy.open(upstream_url),
+        headers={"Range": f"bytes={len(CONTENT)}-"},
+        timeout=10,
+    )
+
+    assert response.status_code == 416
+    assert response.headers["Content-Range"] == f"bytes */{len(CONTENT)}"
+
+
+def test_oldest_streams_are_evicted(proxy, upstream_url):
+    urls = [proxy.open(upstream_url) for _ in range(MAX_STREAMS + 1)]
+
+    assert proxy.lookup(urls[0]) is None
+    assert all(proxy.lookup(url) is not None for url in urls[1:])
+    assert requests.get(urls[0], timeout=10).status_code == 404
+
+
+class ForbiddenHandler(BaseHTTPRequestHandler):
+    """Refuses every request, like googlevideo for a URL bound to another IP."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.ranges.append(self.headers.get("Range"))
+        self.send_response(403)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def test_refused_url_is_reported_without_retrying():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ForbiddenHandler)
+    server.daemon_threads = True
+    server.ranges = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/video.mp4"
+    rejected = []
+    proxy = StreamProxy(buffer_size=1024 * 1024, on_rejected=rejected.append)
+    try:
+        response = requests.get(proxy.open(url), timeout=10)
+    finally:
+        proxy.shutdown()
+        server.shutdown()
+        server.server_close()
+
+    assert response.status_code == 502
+    assert rejected == [url]
+    assert len(server.ranges) == 1
+
+
+def test_download_timing_excludes_backpressure(upstream_url):
+    downloads = []
+    proxy = StreamProxy(
+        buffer_size=256 * 1024,
+        on_download=lambda size, seconds: downloads.append((size, seconds)),
+    )
+    try:
+        local_url = proxy.open(upstream_url)
+        # The fetcher fills the ring and then waits for a reader
+        time.sleep(0.5)
+        response = requests.get(local_url, timeout=10)
+        assert response.content == CONTENT
+    finally:
+        proxy.shutdown()
+
+    assert sum(size for size, _ in downloads) >= len(CONTENT)
+    assert sum(seconds for _, seconds in downloads) < 0.5
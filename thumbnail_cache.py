@@ -0,0 +1,152 @@
+import hashlib
+import os
+import threading
+from io import BytesIO
+from typing import Dict, Optional, Tuple
+
+from kivy.logger import Logger
+
+from app_config import get_cache_dir
+from http_transport import HTTPTransport, get_transport
+
+DEFAULT_DISK_BUDGET = 50 * 1024 * 1024
+JPEG_QUALITY = 85
+
+# Blur applied to previews so their upscaling does not look blocky
+PREVIEW_BLUR_RADIUS = 2
+
+# Smallest first; the API returns a subset of these
+THUMBNAIL_VARIANTS = ("default", "medium", "high", "standard", "maxres")
+
+
+def select_thumbnail(
+    thumbnails: Dict, width: int, height: int, fallback: str = ""
+) -> str:
+    """URL of the smallest thumbnail that covers ``width`` x ``height``.
+
+    Falls back to the largest variant when none is big enough.
+    """
+    variants = [
+        thumbnails[name]
+        for name in THUMBNAIL_VARIANTS
+        if isinstance(thumbnails.get(name), dict) and thumbnails[name].get("url")
+    ]
+    if not variants:
+        return fallback
+
+    for variant in variants:
+        if variant.get("width", 0) >= width and variant.get("height", 0) >= height:
+            return variant["url"]
+    return variants[-1]["url"]
+
+
+class ThumbnailCache:
+    """Size-bounded LRU disk cache of thumbnails resized for display.
+
+    Each image is downloaded and downscaled with Pillow once per display
+    size, then served as a small local JPEG. Access times are tracked via
+    file mtimes so the least recently shown images are evicted first.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        max_bytes: int = DEFAULT_DISK_BUDGET,
+        transport: Optional[HTTPTransport] = None,
+    ):
+        self.directory = directory or get_cache_dir("thumbnails")
+        self.max_bytes = max_bytes
+        self.transport = transport or get_transport()
+        self._lock = threading.Lock()
+        self._total_bytes = self._scan_size()
+        self._evict()
+
+    def path_for(self, url: str, size: Tuple[int, int], preview: bool = False) -> str:
+        digest = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        suffix = "_preview" if preview else ""
+        return os.path.join(self.directory, f"{digest}_{size[0]}x{size[1]}{suffix}.jpg")
+
+    def cached(
+        self, url: str, size: Tuple[int, int], preview: bool = False
+    ) -> Optional[str]:
+        """Local path when already cached, marking it as recently used."""
+        path = self.path_for(url, size, preview)
+        try:
+            os.utime(path)
+        except OSError:
+            return None
+        return path
+
+    def load(self, url: str, size: Tuple[int, int], preview: bool = False) -> str:
+        """Download, resize and store ``url``; runs on the calling thread.
+
+        A ``preview`` is cropped to the aspect ratio of ``size``, which drops
+        the letterbox bars of the 4:3 variants, and blurred.
+        """
+        path = self.cached(url, size, preview)
+        if path:
+            return path
+
+        from PIL import Image, ImageFilter
+
+        response = self.transport.get(url, timeout=10)
+        response.raise_for_status()
+
+        with Image.open(BytesIO(response.content)) as image:
+            image = image.convert("RGB")
+            if preview:
+                image = self._crop_to_aspect(image, size)
+            image.thumbnail(size, Image.LANCZOS)
+            if preview:
+                image = image.filter(ImageFilter.GaussianBlur(PREVIEW_BLUR_RADIUS))
+            path = self.path_for(url, size, preview)
+            partial = f"{path}.{threading.get_ident()}.tmp"
+            image.save(partial, "JPEG", quality=JPEG_QUALITY, optimize=True)
+        os.replace(partial, path)
+
+        with self._lock:
+            self._total_bytes += os.path.getsize(path)
+            over_budget = self._total_bytes > self.max_bytes
+        if over_budget:
+            self._evict()
+        return path
+
+    @staticmethod
+    def _crop_to_aspect(image, size: Tuple[int, int]):
+        width, height = image.size
+        target_height = min(height, round(width * size[1] / size[0]))
+        target_width = min(width, round(height * size[0] / size[1]))
+        left = (width - target_width) // 2
+        top = (height - target_height) // 2
+        return image.crop((left, top, left + target_width, top + target_height))
+
+    def _scan_size(self) -> int:
+        total = 0
+        for entry in os.scandir(self.directory):
+            if entry.is_file():
+                total += entry.stat().st_size
+        return total
+
+    def _evict(self):
+        with self._lock:
+            if self._total_bytes <= self.max_bytes:
+                return
+
+            entries = [
+                (entry.stat().st_mtime, entry.stat().st_size, entry.path)
+                for entry in os.scandir(self.directory)
+                if entry.is_file()
+            ]
+            entries.sort()
+            total = sum(size for _, size, _ in entries)
+            # Evict down to 90% so the next few writes do not rescan
+            target = self.max_bytes * 0.9
+            for _, size, path in entries:
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError as e:
+                    Logger.debug(f"ThumbnailCache: could not delete {path}: {e}")
+            self._total_bytes = total
@@ -0,0 +1,81 @@
+import itertools
+import queue
+import threading
+from concurrent.futures import Future
+from typing import List, Tuple
+
+from kivy.logger import Logger
+
+from thumbnail_cache import ThumbnailCache
+
+# Lower values load first; cards add their position on the page
+PRIORITY_PREVIEW = -100
+PRIORITY_VISIBLE = 0
+PRIORITY_PREFETCH = 100
+
+
+class ThumbnailLoader:
+    """Loads thumbnails through a ``ThumbnailCache`` on a bounded worker pool.
+
+    Requests are served in priority order, so the visible page is loaded
+    before the prefetched next one. Each request gets its own future;
+    cancelling it before a worker picks it up drops the job.
+    """
+
+    def __init__(self, cache: ThumbnailCache, workers: int = 2):
+        self.cache = cache
+        self.workers = workers
+        self._jobs: "queue.PriorityQueue" = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for index in range(self.workers):
+                thread = threading.Thread(
+                    target=self._run, name=f"thumbnail-{index}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def request(
+        self,
+        url: str,
+        size: Tuple[int, int],
+        priority: int = PRIORITY_VISIBLE,
+        preview: bool = False,
+    ) -> Future:
+        """Future resolving to the local path of ``url`` resized to ``size``."""
+        future = Future()
+        path = self.cache.cached(url, size, preview)
+        if path:
+            future.set_result(path)
+            return future
+
+        self.start()
+        job = (url, size, preview)
+        self._jobs.put((priority, next(self._sequence), job, future))
+        return future
+
+    def _run(self):
+        while True:
+            _, _, job, future = self._jobs.get()
+            if future is None:
+                return
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            url = job[0]
+            try:
+                future.set_result(self.cache.load(*job))
+            except Exception as e:
+                Logger.debug(f"ThumbnailLoader: {url} failed: {e}")
+                future.set_exception(e)
+
+    def shutdown(self):
+        # Sentinels sort after every real job
+        for _ in self._threads:
+            self._jobs.put((float("inf"), next(self._sequence), None, None))
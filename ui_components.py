@@ -1,15 +1,28 @@
 import textwrap
 
+from kivy.clock import Clock
 from kivy.graphics import Color, RoundedRectangle
 from kivy.metrics import dp
 from kivy.uix.behaviors import ButtonBehavior
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.button import Button
-from kivy.uix.image import AsyncImage
+from kivy.uix.image import AsyncImage, Image
 from kivy.uix.label import Label
+from kivy.uix.recyclegridlayout import RecycleGridLayout
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
 from kivy.uix.textinput import TextInput
 from kivymd.uix.label import MDIcon
 
+from thumbnail_cache import select_thumbnail
+from thumbnail_loader import PRIORITY_PREVIEW, PRIORITY_VISIBLE
+
+# Pixel size of the thumbnail box on a VideoCard (16:9)
+THUMBNAIL_SIZE = (int(dp(320)), int(dp(180)))
+
+# Blurred stand-in shown until the card-sized image is ready
+PREVIEW_SIZE = (64, 36)
+
 
 class SearchBar(BoxLayout):
     __events__ = ("on_search",)
@@ -57,12 +70,28 @@ class SearchBar(BoxLayout):
         pass
 
 
-class VideoCard(ButtonBehavior, BoxLayout):
-    __events__ = ("on_video_select",)
+class VideoCard(RecycleDataViewBehavior, ButtonBehavior, BoxLayout):
+    """A video tile; widgets are built once and rebound to new video data.
 
-    def __init__(self, video_data, **kwargs):
+    Inside a ``VideoGrid`` the card is recycled through ``refresh_view_attrs``
+    and forwards its events to the grid.
+    """
+
+    __events__ = ("on_video_select", "on_watch_later")
+
+    def __init__(
+        self,
+        video_data=None,
+        thumbnail_loader=None,
+        priority=PRIORITY_VISIBLE,
+        **kwargs,
+    ):
         super().__init__(**kwargs)
-        self.video_data = video_data
+        self.video_data = {}
+        self.grid = None
+        self.thumbnail_loader = thumbnail_loader
+        self._thumbnail_futures = []
+        self._thumbnail_final = False
         self.orientation = "vertical"
         self.size_hint_y = None
         self.height = dp(280)
@@ -71,15 +100,12 @@ class VideoCard(ButtonBehavior, BoxLayout):
 
         self.bind(on_press=self.on_video_press)
 
-        thumbnail_container = BoxLayout(
+        self.thumbnail_container = BoxLayout(
             orientation="vertical", size_hint_y=None, height=dp(180)
         )
-
-        thumbnail_url = video_data.get("thumbnail_url", "")
-        self.thumbnail = AsyncImage(
-            source=thumbnail_url, allow_stretch=True, keep_ratio=True
-        )
-        thumbnail_container.add_widget(self.thumbnail)
+        # Loaded thumbnails are small local files; only remote ones need AsyncImage
+        self.thumbnail = AsyncImage(allow_stretch=True, keep_ratio=True)
+        self.thumbnail_container.add_widget(self.thumbnail)
 
         info_container = BoxLayout(
             orientation="vertical",
@@ -89,14 +115,7 @@ class VideoCard(ButtonBehavior, BoxLayout):
             padding=[0, 0, 0, 0],
         )
 
-        title = video_data.get("title", "No title")
-        # Limit title to 60 characters and wrap
-        if len(title) > 60:
-            title = title[:57] + "..."
-        wrapped_title = "\n".join(textwrap.wrap(title, width=25))
-
         self.title_label = Label(
-            text=wrapped_title,
             text_size=(dp(180), dp(40)),
             halign="left",
             valign="top",
@@ -106,11 +125,7 @@ class VideoCard(ButtonBehavior, BoxLayout):
             height=dp(40),
         )
 
-        channel_name = video_data.get("channel_name", "Unknown")
-        view_count = video_data.get("view_count", "0")
-
         self.channel_label = Label(
-            text=channel_name,
             text_size=(dp(180), None),
             halign="left",
             valign="top",
@@ -121,7 +136,6 @@ class VideoCard(ButtonBehavior, BoxLayout):
         )
 
         self.view_label = Label(
-            text=f"{view_count} views",
             text_size=(dp(180), None),
             halign="left",
             valign="top",
@@ -135,13 +149,232 @@ class VideoCard(ButtonBehavior, BoxLayout):
         info_container.add_widget(self.channel_label)
         info_container.add_widget(self.view_label)
 
-        self.add_widget(thumbnail_container)
+        self.add_widget(self.thumbnail_container)
         self.add_widget(info_container)
 
+        if video_data is not None:
+            self.bind_video(video_data, priority)
+
+    def refresh_view_attrs(self, rv, index, data):
+        self.grid = rv
+        self.thumbnail_loader = rv.thumbnail_loader
+        self.bind_video(data["video_data"], rv.card_priority(index))
+
+    def bind_video(self, video_data, priority=PRIORITY_VISIBLE):
+        self.video_data = video_data
+
+        title = video_data.get("title", "No title")
+        # Limit title to 60 characters and wrap
+        if len(title) > 60:
+            title = title[:57] + "..."
+        self.title_label.text = "\n".join(textwrap.wrap(title, width=25))
+
+        self.channel_label.text = video_data.get("channel_name", "Unknown")
+
+        view_text = f"{video_data.get('view_count', '0')} views"
+        duration = video_data.get("duration")
+        if duration:
+            view_text = f"{view_text} • {duration}"
+        self.view_label.text = view_text
+
+        thumbnail_url = select_thumbnail(
+            video_data.get("thumbnails", {}),
+            *THUMBNAIL_SIZE,
+            fallback=video_data.get("thumbnail_url", ""),
+        )
+        preview_url = video_data.get("thumbnails", {}).get("default", {}).get("url")
+        self._use_image_class(Image if self.thumbnail_loader else AsyncImage)
+        self.thumbnail.source = ""
+        self.load_thumbnail(thumbnail_url, self.thumbnail_loader, priority, preview_url)
+
+    def load_thumbnail(
+        self, url, thumbnail_loader=None, priority=PRIORITY_VISIBLE, preview_url=None
+    ):
+        """Show ``url``, preceded by a blurred ``preview_url`` while it loads."""
+        self.cancel_thumbnail()
+        self._thumbnail_final = False
+        if not url or thumbnail_loader is None:
+            self.thumbnail.source = url
+            return
+
+        future = thumbnail_loader.request(url, THUMBNAIL_SIZE, priority)
+        if future.done():
+            self._show_thumbnail(future, url, final=True)
+            return
+        self._watch_thumbnail(future, url, final=True)
+
+        if preview_url and preview_url != url:
+            preview = thumbnail_loader.request(
+                preview_url, PREVIEW_SIZE, PRIORITY_PREVIEW + priority, preview=True
+            )
+            if preview.done():
+                self._show_thumbnail(preview, None, final=False)
+            else:
+                self._watch_thumbnail(preview, None, final=False)
+
+    def _watch_thumbnail(self, future, fallback, final):
+        def show(dt):
+            # Checked again here: a recycled card may have been rebound to
+            # another video since the worker finished
+            if future in self._thumbnail_futures:
+                self._show_thumbnail(future, fallback, final)
+
+        def on_done(future):
+            if future.cancelled() or future not in self._thumbnail_futures:
+                return
+            Clock.schedule_once(show)
+
+        self._thumbnail_futures.append(future)
+        future.add_done_callback(on_done)
+
+    def _show_thumbnail(self, future, fallback, final):
+        if future.exception() is None:
+            source = future.result()
+        else:
+            # Fall back to the remote image if caching failed
+            source = fallback
+        if not source or self._thumbnail_final:
+            return
+
+        self._thumbnail_final = final
+        if "://" in source:
+            # The fallback is remote; swap in a widget that can load it
+            self._use_image_class(AsyncImage)
+        self.thumbnail.source = source
+
+    def _use_image_class(self, image_class):
+        if type(self.thumbnail) is image_class:
+            return
+        self.thumbnail_container.remove_widget(self.thumbnail)
+        self.thumbnail = image_class(allow_stretch=True, keep_ratio=True)
+        self.thumbnail_container.add_widget(self.thumbnail)
+
+    def cancel_thumbnail(self):
+        """Drop pending thumbnail loads, e.g. when the card is removed."""
+        futures, self._thumbnail_futures = self._thumbnail_futures, []
+        for future in futures:
+            future.cancel()
+
+    def on_touch_down(self, touch):
+        # Right-click queues the video for later instead of playing it
+        if self.collide_point(*touch.pos) and touch.button == "right":
+            self.dispatch("on_watch_later", self.video_data)
+            return True
+        return super().on_touch_down(touch)
+
     def on_video_press(self, instance):
         self.dispatch("on_video_select", self.video_data)
 
     def on_video_select(self, video_data):
+        if self.grid is not None:
+            self.grid.dispatch("on_video_select", video_data)
+
+    def on_watch_later(self, video_data):
+        if self.grid is not None:
+            self.grid.dispatch("on_watch_later", video_data)
+
+
+class _VideoGridLayout(RecycleGridLayout):
+    def set_visible_views(self, indices, data, viewport):
+        # Cards are rebound in here; rank them from the top of the viewport
+        indices = list(indices)
+        self.recycleview.first_visible_index = min(indices, default=0)
+        super().set_visible_views(indices, data, viewport)
+
+
+class VideoGrid(RecycleView):
+    """Virtualized grid of ``VideoCard`` widgets.
+
+    Only the cards in view exist; they are pooled and rebound as ``data``
+    changes or the grid scrolls, so the widget count does not grow with the
+    number of videos.
+    """
+
+    __events__ = ("on_video_select", "on_watch_later", "on_visible_range")
+
+    def __init__(self, thumbnail_loader=None, cols=4, **kwargs):
+        super().__init__(**kwargs)
+        self.thumbnail_loader = thumbnail_loader
+        # Distance from the top to keep in view while appended rows lay out
+        self._anchor_from_top = None
+        self.visible_range = None
+        self.first_visible_index = 0
+        self.priority = PRIORITY_VISIBLE
+
+        layout = _VideoGridLayout(
+            cols=cols,
+            spacing=dp(16),
+            padding=[0, 0, 0, dp(24)],
+            default_size=(None, dp(280)),
+            default_size_hint=(1, None),
+            size_hint_y=None,
+        )
+        layout.bind(minimum_height=layout.setter("height"))
+        layout.bind(height=self._restore_anchor)
+        self.add_widget(layout)
+        # Set after the layout manager exists, which holds the view class
+        self.viewclass = VideoCard
+
+    def set_videos(self, videos, priority=PRIORITY_VISIBLE):
+        # Report the range again for the new data, even if it is unchanged
+        self.visible_range = None
+        self.priority = priority
+        self.data = [{"video_data": video} for video in videos]
+
+    def append_videos(self, videos):
+        """Add ``videos`` below the current ones without moving the viewport."""
+        if not videos:
+            return
+        self._anchor_from_top = self._scrolled_from_top()
+        self.data.extend({"video_data": video} for video in videos)
+
+    def card_priority(self, index):
+        """Thumbnail priority for the card at ``index``, top-left of the view first."""
+        return self.priority + max(0, index - self.first_visible_index)
+
+    def _scrollable_height(self):
+        if self.layout_manager is None:
+            return 0
+        return max(0, self.layout_manager.height - self.height)
+
+    def _scrolled_from_top(self):
+        return (1 - self.scroll_y) * self._scrollable_height()
+
+    def _restore_anchor(self, layout, height):
+        # scroll_y is relative, so a taller layout would otherwise jump
+        anchor, self._anchor_from_top = self._anchor_from_top, None
+        scrollable = self._scrollable_height()
+        if anchor is not None and scrollable > 0:
+            self.scroll_y = min(1, max(0, 1 - anchor / scrollable))
+
+    def refresh_views(self, *largs):
+        super().refresh_views(*largs)
+        indices = (
+            self.layout_manager.view_indices.values() if self.layout_manager else ()
+        )
+        visible = (min(indices), max(indices)) if indices else None
+        if visible is not None and visible != self.visible_range:
+            self.visible_range = visible
+            self.dispatch("on_visible_range", *visible)
+
+    def visible_cards(self):
+        if self.layout_manager is None:
+            return []
+        return [
+            card for card in self.layout_manager.children if isinstance(card, VideoCard)
+        ]
+
+    def cancel_thumbnail_loads(self):
+        for card in self.visible_cards():
+            card.cancel_thumbnail()
+
+    def on_video_select(self, video_data):
+        pass
+
+    def on_watch_later(self, video_data):
+        pass
+
+    def on_visible_range(self, first, last):
         pass
 
 
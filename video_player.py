@@ -2,12 +2,57 @@ import os
 import subprocess
 import threading
 import time
-from typing import Callable, Optional
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Tuple
 
-import yt_dlp
 from kivy.clock import Clock
 from kivy.logger import Logger
 
+from app_config import load_config
+from format_selector import FormatSelector, parse_quality
+from http_transport import get_transport
+from mpv_ipc import MpvIPCClient
+from offline_cache import PRIORITY_HISTORY, OfflineCache
+from playback_health import PlaybackHealth
+from player_control import (
+    VLC_HTTP_AUTH,
+    VLC_HTTP_URL,
+    VlcControlChannel,
+    parse_vlc_status,
+)
+from playback_queue import PlaybackQueue
+from player_output import PlayerOutput
+from position_tracker import PositionTracker
+from stream_cache import StreamCache
+from stream_proxy import StreamProxy
+from stream_resolver import PRIORITY_SPECULATIVE, PreResolver, StreamResolver
+
+MPV_IPC_SOCKET = "/tmp/mpv-socket"
+MPV_OBSERVED_PROPERTIES = (
+    "time-pos",
+    "duration",
+    "pause",
+    "paused-for-cache",
+    "cache-speed",
+    "estimated-frame-number",
+    "frame-drop-count",
+    "decoder-frame-drop-count",
+)
+
+# Seconds to wait for yt-dlp to resolve a stream URL
+RESOLVE_TIMEOUT = 60
+
+# Minimum seconds between two automatic mid-stream quality downgrades
+DOWNGRADE_COOLDOWN = 30
+
+# With auto-play on, the next video is resolved and starts buffering this
+# many seconds before the current one ends.
+PREPARE_BEFORE_END = 30
+
+# A VLC stop counts as the end of the video when the last known position
+# was at most this many seconds from the end.
+END_TOLERANCE = 3
+
 
 class YtDlpLogger:
     def debug(self, msg):
@@ -24,14 +69,37 @@ class YtDlpLogger:
 
 
 class VideoPlayer:
-    def __init__(self, preferred_player="vlc"):
+    def __init__(
+        self,
+        preferred_player="vlc",
+        video_quality=None,
+        auto_downgrade=True,
+        persistent=None,
+        stream_proxy=None,
+        offline_cache=None,
+        auto_play_next=None,
+    ):
         self.preferred_player = preferred_player
         self.current_process = None
+        self.process_player = None
         self.is_playing = False
         self.is_fullscreen = False
         self.current_video_id = None
         self.position_callback = None
+        self.next_video_callback = None
+        self.position_tracker: Optional[PositionTracker] = None
         self.player_socket = None
+        self.mpv = None
+        self.vlc_control = VlcControlChannel()
+        self.player_output = PlayerOutput(on_event=self._on_player_output)
+        self._streaming = False
+        # Set from play_video until the stream stops or ends, including while
+        # its URL resolves and while paused; offline downloads wait for it
+        self._stream_in_use = False
+        self._duration = 0
+        self._vlc_state = None
+        self._vlc_playlist_id = None
+        self._mpv_second = None
 
         self.ydl_opts = {
             "format": "best[height<=720][ext=mp4]/best[ext=mp4]/best",
@@ -47,102 +115,435 @@ class VideoPlayer:
             "geo_bypass": True,
         }
 
+        config = load_config()
+        if video_quality is None:
+            video_quality = config.get("video_quality")
+        if persistent is None:
+            persistent = config.get("persistent_player", True)
+        # Keep one player process alive and load new videos into it
+        self.persistent = persistent
+        if auto_play_next is None:
+            auto_play_next = config.get("auto_play_next", False)
+        self.auto_play_next = auto_play_next
+        self.play_queue = PlaybackQueue()
+        # (video_id, player URL, streams from the network, queued in the player)
+        self._prepared_next = None
+        self._prepared_for = None
+        # Video last restarted on a fresh URL, so a dead one is retried once
+        self._re_resolved_for = None
+        # Orders queueing an up-next video against a new video taking over
+        self._prepare_lock = threading.Lock()
+        self.max_height = parse_quality(video_quality)
+        self.format_selector = FormatSelector(self.max_height)
+
+        self.health = PlaybackHealth()
+        self.auto_downgrade = auto_downgrade
+        self.last_position = 0
+        self._last_downgrade = 0.0
+        # video_id -> (height of the selected format, heights of every playable
+        # format), so a downgrade only restarts when a lower one exists
+        self._format_heights: Dict[str, Tuple[int, List[int]]] = {}
+
+        if stream_proxy is None:
+            stream_proxy = config.get("stream_proxy", False)
+        # Optional local read-ahead buffer between googlevideo and the player
+        self.stream_proxy = (
+            StreamProxy(
+                on_download=self.health.record_download,
+                on_rejected=self._on_stream_rejected,
+            )
+            if stream_proxy
+            else None
+        )
+
+        self.stream_cache = self._create_stream_cache()
+        if offline_cache is None:
+            offline_cache = config.get("offline_cache", True)
+        self.offline_cache = (
+            self._create_offline_cache(config.get("offline_cache_mb", 2048))
+            if offline_cache
+            else None
+        )
+        # Two workers so a speculative resolution never delays a real play
+        self.resolver = StreamResolver(
+            self.ydl_opts, self._select_stream_url, workers=2
+        )
+        self.resolver.start()
+        self.pre_resolver = PreResolver(self._start_pre_resolution, max_in_flight=1)
+
+    def _create_stream_cache(self) -> Optional[StreamCache]:
+        try:
+            return StreamCache()
+        except Exception as e:
+            Logger.warning(f"Stream cache unavailable: {e}")
+            return None
+
+    def _create_offline_cache(self, budget_mb: int) -> Optional[OfflineCache]:
+        try:
+            return OfflineCache(
+                self.ydl_opts,
+                select_format=self._select_download_format,
+                max_bytes=int(budget_mb) * 1024 * 1024,
+                is_busy=self._stream_busy,
+            )
+        except Exception as e:
+            Logger.warning(f"Offline cache unavailable: {e}")
+            return None
+
+    def _stream_busy(self) -> bool:
+        """Whether a network stream is starting, playing or paused."""
+        if not self._stream_in_use:
+            return False
+        # No player yet means the URL is still resolving; a player the user
+        # closed no longer streams
+        return self.current_process is None or self.current_process.poll() is None
+
     def play_video(self, video_id: str, start_time: int = 0):
-        if self.current_process:
+        if self.current_process and not self.persistent:
             self.stop_video()
 
+        if video_id != self._re_resolved_for:
+            self._re_resolved_for = None
         self.current_video_id = video_id
+        self.last_position = start_time
+        self._duration = 0
+        self.format_selector.max_height = self.health.recommended_max_height(
+            self.max_height
+        )
+        self.health.start_stream()
+        self._stream_in_use = True
 
         # Start video URL extraction and player launch in background thread
         def launch_video():
             try:
+                # Taken first so a URL queued in the player is dropped before
+                # anything else is loaded
+                with self._prepare_lock:
+                    player_url = self._take_prepared_url(video_id)
+                local_path = self._get_offline_path(video_id)
+                self._streaming = local_path is None
+                self._stream_in_use = self._streaming
+                if local_path:
+                    Logger.info(f"Playing {video_id} from the offline cache")
+                    if player_url and self.stream_proxy:
+                        self.stream_proxy.close_stream(player_url)
+                    self._start_player(local_path, start_time)
+                    return
+
+                if player_url:
+                    Logger.info(f"Playing prepared up-next video {video_id}")
+                    self._start_player(player_url, start_time)
+                    return
+
                 video_url = self._get_video_url(video_id)
                 if video_url:
-                    self._start_player(video_url, start_time)
+                    self._start_player(self._proxied_url(video_url), start_time)
+                    if self.current_process is None:
+                        # No player could be started
+                        self._stream_in_use = False
                 else:
                     Logger.error("Failed to get video URL")
+                    self._stream_in_use = False
             except Exception as e:
                 Logger.error(f"Error playing video: {e}")
+                self._stream_in_use = False
 
         threading.Thread(target=launch_video, daemon=True).start()
 
-    def _get_video_url(self, video_id: str) -> Optional[str]:
+    def _get_offline_path(self, video_id: str) -> Optional[str]:
+        if not self.offline_cache:
+            return None
+        path = self.offline_cache.get(video_id)
+        if path:
+            self.pre_resolver.claim(video_id)
+        return path
+
+    def save_for_offline(self, video_id: str, priority: int = PRIORITY_HISTORY):
+        """Download ``video_id`` into the offline cache in the background."""
+        if self.offline_cache:
+            self.offline_cache.enqueue(video_id, priority)
+
+    def add_to_watch_later(self, video_data: Dict):
+        if self.offline_cache:
+            self.offline_cache.add_watch_later(video_data)
+
+    def remove_from_watch_later(self, video_id: str):
+        if self.offline_cache:
+            self.offline_cache.remove_watch_later(video_id)
+
+    def watch_later_videos(self) -> List[Dict]:
+        return self.offline_cache.watch_later() if self.offline_cache else []
+
+    def set_up_next(self, videos: List[Dict], current_video_id: str):
+        """Queue the videos following ``current_video_id`` for auto-play."""
+        self.play_queue.set_up_next(videos, current_video_id)
+
+    def _maybe_prepare_next(self, current: int, total: int):
+        if not self.auto_play_next or total <= 0:
+            return
+        if total - current > PREPARE_BEFORE_END:
+            return
+
+        video_id = self.current_video_id
+        next_video = self.play_queue.peek_next()
+        if not next_video or self._prepared_for == video_id:
+            return
+
+        self._prepared_for = video_id
+        threading.Thread(
+            target=self._prepare_next,
+            args=(next_video["video_id"], video_id),
+            daemon=True,
+        ).start()
+
+    def _prepare_next(self, video_id: str, after_video_id: str):
+        local_path = self.offline_cache.get(video_id) if self.offline_cache else None
+        if local_path:
+            player_url = local_path
+        else:
+            video_url = self._get_video_url(video_id)
+            if not video_url:
+                return
+            player_url = video_url
+            if self.stream_proxy:
+                # Start filling the read-ahead buffer while this video finishes
+                try:
+                    player_url = self.stream_proxy.open(video_url)
+                except Exception as e:
+                    Logger.warning(f"Could not pre-buffer {video_id}: {e}")
+
+        with self._prepare_lock:
+            if self.current_video_id != after_video_id:
+                # Another video started while this one resolved; its load
+                # has cleared the playlist this would be appended to
+                Logger.info(f"Dropping up-next video {video_id}")
+                if local_path is None and self.stream_proxy:
+                    self.stream_proxy.close_stream(player_url)
+                return
+            self._discard_prepared()
+            queued = self._queue_in_player(player_url)
+            self._prepared_next = (video_id, player_url, local_path is None, queued)
+        Logger.info(
+            f"Prepared up-next video {video_id}"
+            + (f", queued in {self.process_player}" if queued else "")
+        )
+
+    def _queue_in_player(self, player_url: str) -> bool:
+        """Append ``player_url`` to the running player's playlist.
+
+        The player then moves on by itself at the end of the current video;
+        mpv also opens and buffers it early (``--prefetch-playlist``).
+        """
+        if not self._player_running():
+            return False
         try:
-            youtube_url = f"https://www.youtube.com/watch?v={video_id}"
-
-            with yt_dlp.YoutubeDL(self.ydl_opts) as ydl:
-                info = ydl.extract_info(youtube_url, download=False)
-
-                if not info:
-                    Logger.error("No video info extracted")
-                    return None
-
-                # Try different format selection strategies
-                formats = info.get("formats", [])
-
-                if not formats:
-                    Logger.error("No formats available")
-                    return None
-
-                # Strategy 1: Look for mp4 with both video and audio, height <= 720
-                for fmt in formats:
-                    if (
-                        fmt.get("ext") == "mp4"
-                        and fmt.get("vcodec") != "none"
-                        and fmt.get("acodec") != "none"
-                        and fmt.get("height", 0) <= 720
-                        and fmt.get("url")
-                    ):
-                        Logger.info(
-                            f"Selected format: {fmt.get('format_id')} - {fmt.get('height')}p"
-                        )
-                        return fmt["url"]
-
-                # Strategy 2: Look for any mp4 with both video and audio
-                for fmt in formats:
-                    if (
-                        fmt.get("ext") == "mp4"
-                        and fmt.get("vcodec") != "none"
-                        and fmt.get("acodec") != "none"
-                        and fmt.get("url")
-                    ):
-                        Logger.info(
-                            f"Selected format: {fmt.get('format_id')} - {fmt.get('height')}p"
-                        )
-                        return fmt["url"]
-
-                # Strategy 3: Look for any format with both video and audio
-                for fmt in formats:
-                    if (
-                        fmt.get("vcodec") != "none"
-                        and fmt.get("acodec") != "none"
-                        and fmt.get("url")
-                    ):
-                        Logger.info(
-                            f"Selected format: {fmt.get('format_id')} - {fmt.get('height')}p"
-                        )
-                        return fmt["url"]
-
-                # Strategy 4: Use the first available format
-                if formats and formats[0].get("url"):
-                    Logger.info(
-                        f"Using first available format: {formats[0].get('format_id')}"
-                    )
-                    return formats[0]["url"]
-
-                # Strategy 5: Try the direct URL from info
-                if info.get("url"):
-                    Logger.info("Using direct URL from info")
-                    return info["url"]
-
-                Logger.error("No suitable format found")
-                return None
+            if self.process_player == "vlc":
+                # A --start-time from the command line would apply to it too
+                self._vlc_command(
+                    "in_enqueue", input=player_url, option="start-time=0"
+                ).result(timeout=2)
+            else:
+                # "start" is global; the current video has already used it
+                self._mpv_command("set_property", "start", "none")
+                self._mpv_command("loadfile", player_url, "append")
+        except Exception as e:
+            Logger.warning(f"Could not queue the next video in the player: {e}")
+            return False
+        return True
+
+    def _take_prepared_url(self, video_id: str) -> Optional[str]:
+        prepared = self._prepared_next
+        if prepared and prepared[0] == video_id:
+            self._prepared_next = None
+            return prepared[1]
+        self._discard_prepared()
+        return None
+
+    def _discard_prepared(self):
+        prepared, self._prepared_next = self._prepared_next, None
+        if prepared and self.stream_proxy:
+            self.stream_proxy.close_stream(prepared[1])
 
+    def _on_playback_ended(self):
+        # Runs on the position tracker or mpv IPC thread
+        self.is_playing = False
+        self._stream_in_use = False
+        if not self.auto_play_next:
+            return
+
+        prepared = self._prepared_next
+        if self.process_player == "mpv" and prepared and prepared[3]:
+            # mpv is already playing the queued video
+            self._on_player_advanced()
+            return
+
+        next_video = self.play_queue.advance()
+        if next_video:
+            Logger.info(f"Auto-playing next video {next_video['video_id']}")
+            Clock.schedule_once(lambda dt: self._play_up_next(next_video), 0)
+
+    def _on_player_advanced(self):
+        """The player moved on to the video queued by ``_queue_in_player``."""
+        video_id, _, streaming, _ = self._prepared_next
+        self._prepared_next = None
+        next_video = self.play_queue.advance()
+        if next_video and next_video["video_id"] != video_id:
+            next_video = None
+
+        Logger.info(f"{self.process_player} moved on to queued video {video_id}")
+        self.current_video_id = video_id
+        self.last_position = 0
+        self._duration = 0
+        self._streaming = streaming
+        self._stream_in_use = streaming
+        self.is_playing = True
+        self.health.start_stream()
+        self._notify_position_jump()
+        if self.next_video_callback and next_video:
+            Clock.schedule_once(lambda dt: self.next_video_callback(next_video), 0)
+
+    def _play_up_next(self, video_data: Dict):
+        self.play_video(video_data["video_id"])
+        if self.next_video_callback:
+            self.next_video_callback(video_data)
+
+    def pre_resolve(self, video_ids: List[str]):
+        """Resolve stream URLs for ``video_ids`` in the background, in order."""
+        self.pre_resolver.schedule(video_ids)
+
+    def prioritize_pre_resolve(self, video_id: str):
+        self.pre_resolver.prioritize(video_id)
+
+    def _start_pre_resolution(self, video_id: str) -> Optional[Future]:
+        format_pref = self.format_selector.cache_key
+        if not self.stream_cache or self.stream_cache.get(video_id, format_pref):
+            return None
+
+        future = self.resolver.submit(video_id, priority=PRIORITY_SPECULATIVE)
+
+        def store(f):
+            if not f.cancelled() and f.exception() is None and f.result():
+                self.stream_cache.put(video_id, format_pref, f.result())
+
+        future.add_done_callback(store)
+        return future
+
+    def _get_video_url(self, video_id: str) -> Optional[str]:
+        format_pref = self.format_selector.cache_key
+        self.pre_resolver.claim(video_id)
+
+        if self.stream_cache:
+            cached_url = self.stream_cache.get(video_id, format_pref)
+            if cached_url:
+                Logger.info(f"Using cached stream URL for {video_id}")
+                return cached_url
+
+        video_url = self._resolve_video_url(video_id)
+        if video_url and self.stream_cache:
+            self.stream_cache.put(video_id, format_pref, video_url)
+        return video_url
+
+    def _on_stream_rejected(self, video_url: Optional[str] = None):
+        """Drop a stream URL that stopped working and play on a fresh one.
+
+        googlevideo URLs are bound to the client's IP, so a cached URL can
+        fail long before it expires. ``video_url`` is the refused upstream
+        URL when known; otherwise the current video's entry is dropped.
+        """
+        video_id = self.current_video_id
+        if video_url is not None:
+            owner = (
+                self.stream_cache.invalidate_url(video_url)
+                if self.stream_cache
+                else None
+            )
+            if owner is None or owner != video_id:
+                # Not the playing video, e.g. the prepared up-next one
+                return
+        elif not video_id or not self._streaming:
+            return
+        elif self.stream_cache:
+            self.stream_cache.invalidate(video_id)
+
+        if video_id == self._re_resolved_for:
+            return
+        self._re_resolved_for = video_id
+        position = self.last_position
+        Logger.warning(f"Stream URL for {video_id} was refused; resolving it again")
+        Clock.schedule_once(
+            lambda dt: self.play_video(video_id, start_time=position), 0
+        )
+
+    def _resolve_video_url(self, video_id: str) -> Optional[str]:
+        try:
+            return self.resolver.resolve(video_id, timeout=RESOLVE_TIMEOUT)
         except Exception as e:
             Logger.error(f"yt-dlp error: {e}")
             return None
 
+    def _proxied_url(self, video_url: str) -> str:
+        if not self.stream_proxy or not video_url.startswith(("http://", "https://")):
+            return video_url
+        try:
+            # Replaces the stream of the video being left
+            self.stream_proxy.close_streams()
+            return self.stream_proxy.open(video_url)
+        except Exception as e:
+            Logger.warning(f"Stream proxy unavailable, playing directly: {e}")
+            return video_url
+
+    def _select_download_format(self, ctx: Dict):
+        """yt-dlp format selector for offline downloads."""
+        formats = ctx.get("formats", [])
+        fmt = self.format_selector.select(formats)
+        if fmt is None and formats:
+            # yt-dlp orders formats worst to best
+            fmt = formats[-1]
+        if fmt:
+            yield fmt
+
+    def _select_stream_url(self, info: Dict) -> Optional[str]:
+        formats = info.get("formats", [])
+
+        fmt = self.format_selector.select(formats)
+        if fmt:
+            Logger.info(
+                f"Selected format: {fmt.get('format_id')} - {fmt.get('height')}p "
+                f"{fmt.get('vcodec')} {fmt.get('ext')}"
+            )
+            if info.get("id"):
+                self._format_heights[info["id"]] = (
+                    fmt.get("height") or 0,
+                    [
+                        f.get("height") or 0
+                        for f in formats
+                        if self.format_selector.is_playable(f)
+                    ],
+                )
+            return fmt["url"]
+
+        # No muxed audio+video format: use the first available format
+        if formats and formats[0].get("url"):
+            Logger.info(f"Using first available format: {formats[0].get('format_id')}")
+            return formats[0]["url"]
+
+        # Try the direct URL from info
+        if info.get("url"):
+            Logger.info("Using direct URL from info")
+            return info["url"]
+
+        Logger.error("No suitable format found")
+        return None
+
     def _start_player(self, video_url: str, start_time: int = 0):
+        if self.persistent and self._player_running():
+            try:
+                self._load_into_player(video_url, start_time)
+                return
+            except Exception as e:
+                Logger.warning(f"Could not reuse running player, restarting: {e}")
+                self._terminate_player()
+
         try:
             if self.preferred_player == "vlc":
                 self._start_vlc(video_url, start_time)
@@ -165,7 +566,8 @@ class VideoPlayer:
             "8080",
             "--fullscreen" if self.is_fullscreen else "--no-fullscreen",
             "--no-video-title-show",
-            "--quiet",
+            # Warnings such as late pictures feed PlayerOutput
+            "--verbose=1",
             "--network-caching=300",
             "--file-caching=300",
             "--live-caching=300",
@@ -175,6 +577,12 @@ class VideoPlayer:
             "--skip-frames",
         ]
 
+        if self.persistent:
+            # VLC's own interface stays up between videos, since its seek bar
+            # and play/pause are the playback controls. Start positions come
+            # from the app, so never ask to resume.
+            vlc_cmd.append("--qt-continue=0")
+
         if start_time > 0:
             vlc_cmd.extend(["--start-time", str(start_time)])
 
@@ -185,6 +593,8 @@ class VideoPlayer:
                 stderr=subprocess.PIPE,
                 creationflags=subprocess.CREATE_NO_WINDOW if os.name == "nt" else 0,
             )
+            self.player_output.attach(self.current_process)
+            self.process_player = "vlc"
             self.is_playing = True
             Logger.info("VLC player started")
 
@@ -201,12 +611,20 @@ class VideoPlayer:
         mpv_cmd = [
             "mpv",
             video_url,
-            "--input-ipc-server=/tmp/mpv-socket",
+            f"--input-ipc-server={MPV_IPC_SOCKET}",
             "--fullscreen" if self.is_fullscreen else "--no-fullscreen",
-            "--no-terminal",
-            "--quiet",
+            # Log warnings plus the codec and hwdec lines PlayerOutput parses,
+            # without reading keys from the app's terminal
+            "--input-terminal=no",
+            # Open and buffer a queued up-next video before this one ends
+            "--prefetch-playlist=yes",
+            "--msg-level=all=warn,cplayer=info,vd=info",
         ]
 
+        if self.persistent:
+            # Stay alive with no window once a video ends or is stopped
+            mpv_cmd.extend(["--idle=yes", "--force-window=no", "--keep-open=no"])
+
         if start_time > 0:
             mpv_cmd.extend(["--start", f"+{start_time}"])
 
@@ -217,10 +635,12 @@ class VideoPlayer:
                 stderr=subprocess.PIPE,
                 creationflags=subprocess.CREATE_NO_WINDOW if os.name == "nt" else 0,
             )
+            self.player_output.attach(self.current_process)
+            self.process_player = "mpv"
             self.is_playing = True
             Logger.info("MPV player started")
 
-            self._start_position_monitor()
+            self._connect_mpv()
 
         except FileNotFoundError:
             Logger.error("MPV not found. Please install MPV media player.")
@@ -229,6 +649,32 @@ class VideoPlayer:
             Logger.error(f"MPV error: {e}")
             self._try_fallback_player(video_url, start_time)
 
+    def _player_running(self) -> bool:
+        return (
+            self.current_process is not None
+            and self.current_process.poll() is None
+            and self.process_player == self.preferred_player
+        )
+
+    def _load_into_player(self, video_url: str, start_time: int = 0):
+        if self.process_player == "vlc":
+            self._vlc_command("pl_empty")
+            self._vlc_playlist_id = None
+            params = {"input": video_url}
+            if start_time > 0:
+                params["option"] = f"start-time={start_time}"
+            # Wait for the load itself so a dead player triggers a respawn
+            self._vlc_command("in_play", **params).result(timeout=2)
+            self._notify_position_jump()
+        else:
+            self.mpv.set_property("start", f"+{start_time}")
+            # Drop a queued up-next entry so it does not follow this video
+            self._mpv_command("playlist-clear")
+            self._mpv_command("loadfile", video_url, "replace")
+
+        self.is_playing = True
+        Logger.info(f"Loaded video into running {self.process_player}")
+
     def _try_fallback_player(self, video_url: str, start_time: int = 0):
         fallback_player = "mpv" if self.preferred_player == "vlc" else "vlc"
         Logger.info(f"Trying fallback player: {fallback_player}")
@@ -243,70 +689,232 @@ class VideoPlayer:
             self.preferred_player = original_player
 
     def _start_position_monitor(self):
+        process = self.current_process
+        self._stop_position_tracker()
+        self._vlc_state = None
+        self._vlc_playlist_id = None
+        self.position_tracker = PositionTracker(
+            self._sample_vlc_position, self._on_position_second
+        )
+        self.position_tracker.start(
+            lambda: process is self.current_process and process.poll() is None
+        )
+
+    def _stop_position_tracker(self):
+        if self.position_tracker:
+            self.position_tracker.stop()
+            self.position_tracker = None
+
+    def _notify_position_jump(self):
+        if self.position_tracker:
+            self.position_tracker.notify_seek()
+
+    def _on_position_second(self, current: int, total: int):
+        # Runs on the tracker thread, once per displayed second
+        self.last_position = current
+        self._duration = total
+        self._maybe_prepare_next(current, total)
         if self.position_callback:
+            position_info = {"current": current, "total": total}
+            Clock.schedule_once(lambda dt: self.position_callback(position_info), 0)
+
+    def _sample_vlc_position(self) -> Optional[Dict]:
+        response = get_transport().get(
+            VLC_HTTP_URL, auth=VLC_HTTP_AUTH, timeout=1, retry=False
+        )
+        if response.status_code != 200:
+            return None
 
-            def monitor():
-                while self.current_process and self.current_process.poll() is None:
-                    try:
-                        if self.preferred_player == "vlc":
-                            position_info = self._get_vlc_position()
-                        else:
-                            position_info = self._get_mpv_position()
+        status = parse_vlc_status(response.text)
+        self._check_vlc_advanced(status.get("currentplid"))
+        self._check_vlc_ended(status.get("state"))
+        self._record_vlc_stats(status)
+        self._check_playback_health()
 
-                        if position_info:
-                            Clock.schedule_once(
-                                lambda dt: self.position_callback(position_info), 0
-                            )
-                    except Exception as e:
-                        Logger.debug(f"Position monitor error: {e}")
+        try:
+            total = int(status["length"])
+            current = float(status["time"])
+        except (KeyError, ValueError):
+            return None
 
-                    time.sleep(1)
+        # ``position`` is a fraction with sub-second precision, ``time`` is not
+        try:
+            fraction = float(status.get("position", ""))
+            if total > 0 and abs(fraction * total - current) < 1:
+                current = fraction * total
+        except ValueError:
+            pass
 
-            thread = threading.Thread(target=monitor, daemon=True)
-            thread.start()
+        return {"position": current, "total": total, "state": status.get("state")}
+
+    def _check_vlc_advanced(self, playlist_id: Optional[str]):
+        # VLC goes straight to a queued video, without a stopped state
+        previous, self._vlc_playlist_id = self._vlc_playlist_id, playlist_id
+        if previous is None or playlist_id is None or playlist_id == previous:
+            return
+        prepared = self._prepared_next
+        if prepared and prepared[3]:
+            self._on_player_advanced()
+
+    def _check_vlc_ended(self, state: Optional[str]):
+        previous, self._vlc_state = self._vlc_state, state
+        if state != "stopped" or previous != "playing" or not self.is_playing:
+            return
+        if self._duration and self._duration - self.last_position <= END_TOLERANCE:
+            Logger.info("VLC: playback ended")
+            self._on_playback_ended()
+
+    def _record_vlc_stats(self, status: Dict[str, str]):
+        def stat(name):
+            try:
+                return float(status[name])
+            except (KeyError, ValueError):
+                return None
 
-    def _get_vlc_position(self):
+        # VLC reports the input bitrate in bytes per microsecond. It is the
+        # rate VLC reads the stream at, not the bandwidth available.
+        input_bitrate = stat("inputbitrate")
+        if input_bitrate:
+            self.health.record_consumption(input_bitrate * 8_000_000)
+
+        displayed = stat("displayedpictures")
+        lost = stat("lostpictures")
+        if displayed is not None and lost is not None:
+            self.health.record_frames(int(displayed), int(lost))
+
+    def _on_player_output(self, event):
+        # Runs on a pipe reader thread
+        if event["type"] in ("codec", "hwdec"):
+            Logger.info(f"Player {event['type']}: {event['value']}")
+        elif event["type"] == "http_rejected":
+            Logger.warning(f"Player: {event['line']}")
+            self._on_stream_rejected()
+        elif event["type"] == "error":
+            Logger.debug(f"Player: {event['line']}")
+
+    def get_player_log(self, count: int = 50) -> List[str]:
+        """The most recent player stdout/stderr lines, for diagnostics."""
+        return self.player_output.recent_lines(count)
+
+    def _check_playback_health(self):
+        if not self.auto_downgrade or not self._streaming:
+            return
+        if not self.health.should_downgrade():
+            return
+        if time.monotonic() - self._last_downgrade < DOWNGRADE_COOLDOWN:
+            return
+
+        video_id, position = self.current_video_id, self.last_position
+        self._last_downgrade = time.monotonic()
+        heights = self._format_heights.get(video_id)
+        if heights is None:
+            # URL cached by an earlier session: the formats are unknown, so
+            # only cap the next plays
+            self.health.register_downgrade(self.format_selector.max_height)
+            return
+
+        playing, available = heights
+        new_cap = self.health.register_downgrade(playing)
+        if new_cap is None or not any(height <= new_cap for height in available):
+            Logger.info(f"No format below {playing}p for {video_id}; not restarting")
+            return
+
+        Logger.info(f"Resuming {video_id} at {position}s capped at {new_cap}p")
+        Clock.schedule_once(
+            lambda dt: self.play_video(video_id, start_time=position), 0
+        )
+
+    def _connect_mpv(self):
+        self._close_mpv()
+        self._mpv_second = None
+        self.mpv = MpvIPCClient(
+            MPV_IPC_SOCKET,
+            on_property=self._on_mpv_property,
+            on_event=self._on_mpv_event,
+        )
         try:
-            import requests
-
-            response = requests.get(
-                "http://localhost:8080/requests/status.xml",
-                auth=("", "raspytube"),
-                timeout=1,
+            self.mpv.connect(timeout=5)
+        except OSError as e:
+            Logger.error(f"Could not connect to mpv IPC socket: {e}")
+            return
+
+        for name in MPV_OBSERVED_PROPERTIES:
+            self.mpv.observe_property(name)
+
+    def _close_mpv(self):
+        if self.mpv:
+            self.mpv.close()
+            self.mpv = None
+
+    def _on_mpv_property(self, name, value):
+        # Runs on the IPC reader thread
+        if name == "time-pos":
+            if value is None:
+                return
+            second = int(value)
+            if second != self._mpv_second:
+                self._mpv_second = second
+                self._on_mpv_second()
+        elif name == "pause":
+            self.is_playing = not value
+        elif name == "paused-for-cache" and value:
+            Logger.debug("mpv: buffering")
+        elif name == "cache-speed" and value:
+            # Only a starved player shows what the network can deliver
+            if self.mpv and self.mpv.properties.get("paused-for-cache"):
+                self.health.record_throughput(value * 8)
+            else:
+                self.health.record_consumption(value * 8)
+
+    def _on_mpv_second(self):
+        properties = self.mpv.properties if self.mpv else {}
+        displayed = properties.get("estimated-frame-number")
+        if displayed is not None:
+            lost = (properties.get("frame-drop-count") or 0) + (
+                properties.get("decoder-frame-drop-count") or 0
             )
-
-            if response.status_code == 200:
-                import xml.etree.ElementTree as ET
-
-                root = ET.fromstring(response.text)
-
-                time_elem = root.find(".//time")
-                length_elem = root.find(".//length")
-
-                if time_elem is not None and length_elem is not None:
-                    current_time = int(time_elem.text)
-                    total_time = int(length_elem.text)
-                    return {"current": current_time, "total": total_time}
-        except Exception:
-            pass
-        return None
+            self.health.record_frames(displayed, lost)
+
+        position_info = self._get_mpv_position()
+        if position_info:
+            self.last_position = position_info["current"]
+            self._duration = position_info["total"]
+            self._maybe_prepare_next(position_info["current"], position_info["total"])
+            if self.position_callback:
+                Clock.schedule_once(
+                    lambda dt, info=position_info: self.position_callback(info), 0
+                )
+
+        self._check_playback_health()
+
+    def _on_mpv_event(self, event):
+        if event.get("event") == "end-file":
+            Logger.info(f"mpv: playback ended ({event.get('reason')})")
+            self.is_playing = False
+            self._mpv_second = None
+            if event.get("reason") == "eof":
+                self._on_playback_ended()
+            elif event.get("reason") == "error":
+                # Typically a stream URL that expired or is bound to an old IP
+                self._on_stream_rejected()
 
     def _get_mpv_position(self):
-        return None
+        if not self.mpv:
+            return None
+        current = self.mpv.properties.get("time-pos")
+        if current is None:
+            return None
+        total = self.mpv.properties.get("duration") or 0
+        return {"current": int(current), "total": int(total)}
 
     def pause_video(self):
         if self.current_process:
             try:
                 if self.preferred_player == "vlc":
-                    import requests
-
-                    requests.get(
-                        "http://localhost:8080/requests/status.xml?command=pl_pause",
-                        auth=("", "raspytube"),
-                        timeout=1,
-                    )
+                    self._vlc_command("pl_pause")
+                    self._notify_position_jump()
                 elif self.preferred_player == "mpv":
-                    pass
+                    self._mpv_async("set_property", "pause", True)
 
                 self.is_playing = False
             except Exception as e:
@@ -316,21 +924,33 @@ class VideoPlayer:
         if self.current_process:
             try:
                 if self.preferred_player == "vlc":
-                    import requests
-
-                    requests.get(
-                        "http://localhost:8080/requests/status.xml?command=pl_play",
-                        auth=("", "raspytube"),
-                        timeout=1,
-                    )
+                    self._vlc_command("pl_play")
+                    self._notify_position_jump()
                 elif self.preferred_player == "mpv":
-                    pass
+                    self._mpv_async("set_property", "pause", False)
 
                 self.is_playing = True
             except Exception as e:
                 Logger.error(f"Resume error: {e}")
 
     def stop_video(self):
+        if self.persistent and self._player_running():
+            try:
+                if self.process_player == "vlc":
+                    self._vlc_command("pl_stop")
+                else:
+                    self._mpv_command("stop")
+                self.is_playing = False
+                self._stream_in_use = False
+                self.current_video_id = None
+                self._close_proxied_streams()
+                return
+            except Exception as e:
+                Logger.warning(f"Could not stop running player, terminating: {e}")
+
+        self._terminate_player()
+
+    def _terminate_player(self):
         if self.current_process:
             try:
                 self.current_process.terminate()
@@ -340,8 +960,14 @@ class VideoPlayer:
             except Exception as e:
                 Logger.error(f"Stop error: {e}")
             finally:
+                self._close_mpv()
+                self._stop_position_tracker()
+                self._close_proxied_streams()
+                self.vlc_control.clear()
                 self.current_process = None
+                self.process_player = None
                 self.is_playing = False
+                self._stream_in_use = False
                 self.current_video_id = None
 
     def toggle_fullscreen(self):
@@ -350,13 +976,9 @@ class VideoPlayer:
         if self.current_process:
             try:
                 if self.preferred_player == "vlc":
-                    import requests
-
-                    requests.get(
-                        "http://localhost:8080/requests/status.xml?command=fullscreen",
-                        auth=("", "raspytube"),
-                        timeout=1,
-                    )
+                    self._vlc_command("fullscreen")
+                elif self.preferred_player == "mpv":
+                    self._mpv_async("set_property", "fullscreen", self.is_fullscreen)
             except Exception as e:
                 Logger.error(f"Fullscreen toggle error: {e}")
 
@@ -364,13 +986,9 @@ class VideoPlayer:
         if self.current_process and 0 <= volume <= 100:
             try:
                 if self.preferred_player == "vlc":
-                    import requests
-
-                    requests.get(
-                        f"http://localhost:8080/requests/status.xml?command=volume&val={volume}",
-                        auth=("", "raspytube"),
-                        timeout=1,
-                    )
+                    self._vlc_command("volume", volume)
+                elif self.preferred_player == "mpv":
+                    self._mpv_async("set_property", "volume", volume)
             except Exception as e:
                 Logger.error(f"Volume error: {e}")
 
@@ -378,18 +996,50 @@ class VideoPlayer:
         if self.current_process:
             try:
                 if self.preferred_player == "vlc":
-                    import requests
-
-                    requests.get(
-                        f"http://localhost:8080/requests/status.xml?command=seek&val={position}",
-                        auth=("", "raspytube"),
-                        timeout=1,
-                    )
+                    self._vlc_command("seek", position)
+                    self._notify_position_jump()
+                elif self.preferred_player == "mpv":
+                    self._mpv_async("seek", position, "absolute")
             except Exception as e:
                 Logger.error(f"Seek error: {e}")
 
+    def _vlc_command(self, command: str, val=None, **extra) -> Future:
+        return self.vlc_control.send(command, val, **extra)
+
+    def _mpv_command(self, *command):
+        if not self.mpv or not self.mpv.connected:
+            raise RuntimeError("mpv IPC not connected")
+        return self.mpv.command(*command)
+
+    def _mpv_async(self, *command):
+        """Send an mpv command without waiting; failures are only logged."""
+        if not self.mpv or not self.mpv.connected:
+            raise RuntimeError("mpv IPC not connected")
+
+        def log_error(future):
+            if future.exception() is not None:
+                Logger.error(f"mpv {command[0]} failed: {future.exception()}")
+
+        self.mpv.command_async(*command).add_done_callback(log_error)
+
     def set_position_callback(self, callback: Callable):
         self.position_callback = callback
 
+    def set_next_video_callback(self, callback: Callable):
+        """Called on the main thread with each auto-played video's data."""
+        self.next_video_callback = callback
+
+    def _close_proxied_streams(self):
+        self._prepared_next = None
+        if self.stream_proxy:
+            self.stream_proxy.close_streams()
+
     def cleanup(self):
-        self.stop_video()
+        self._terminate_player()
+        if self.stream_proxy:
+            self.stream_proxy.shutdown()
+        self.vlc_control.close()
+        self.pre_resolver.cancel()
+        if self.offline_cache:
+            self.offline_cache.shutdown()
+        self.resolver.shutdown()
@@ -1,14 +1,64 @@
 import json
-from typing import Dict, List, Optional
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Tuple
 
 import requests
 from kivy.logger import Logger
 
+from api_cache import ResponseCache
+from http_transport import HTTPTransport, get_transport
+from quota import QuotaExceededError, QuotaLedger
+
+# videos.list accepts at most 50 ids per call
+ENRICH_BATCH_SIZE = 50
+ENRICHED_FIELDS = (
+    "view_count",
+    "like_count",
+    "comment_count",
+    "duration",
+    "definition",
+)
+
 
 class YouTubeAPI:
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        cache: Optional[ResponseCache] = None,
+        stale_while_revalidate: bool = True,
+        transport: Optional[HTTPTransport] = None,
+        quota: Optional[QuotaLedger] = None,
+    ):
         self.api_key = api_key or self._get_api_key_from_config()
         self.base_url = "https://www.googleapis.com/youtube/v3"
+        self.transport = transport or get_transport()
+        self.cache = cache if cache is not None else self._create_cache()
+        self.quota = quota if quota is not None else self._create_quota()
+        self.stale_while_revalidate = stale_while_revalidate
+        self._revalidating = set()
+        self._revalidating_lock = threading.Lock()
+        self._in_flight = SingleFlight()
+
+    def _create_cache(self) -> Optional[ResponseCache]:
+        try:
+            return ResponseCache()
+        except Exception as e:
+            Logger.warning(f"Response cache unavailable: {e}")
+            return None
+
+    def _create_quota(self) -> Optional[QuotaLedger]:
+        try:
+            return QuotaLedger()
+        except Exception as e:
+            Logger.warning(f"Quota ledger unavailable: {e}")
+            return None
+
+    def remaining_quota(self) -> Optional[int]:
+        return self.quota.remaining if self.quota else None
+
+    def _quota_is_low(self) -> bool:
+        return self.quota is not None and self.quota.is_low()
 
     def _get_api_key_from_config(self) -> Optional[str]:
         try:
@@ -24,13 +74,112 @@ class YouTubeAPI:
             Logger.error(f"Error reading config: {e}")
             return None
 
+    def prewarm(self):
+        if self.api_key:
+            self.transport.prewarm(self.base_url)
+
+    def _request(self, endpoint: str, params: Dict) -> Dict:
+        # Identical concurrent calls share one request and its result
+        key = ResponseCache.make_key(endpoint, params)
+        return self._in_flight.do(key, lambda: self._cached_request(endpoint, params))
+
+    def _cached_request(self, endpoint: str, params: Dict) -> Dict:
+        entry = self.cache.get(endpoint, params) if self.cache else None
+
+        if entry:
+            if entry.is_fresh():
+                return entry.body
+
+            if self._quota_is_low():
+                # Any cached copy beats spending scarce quota on a refresh
+                return entry.body
+
+            if self.stale_while_revalidate and entry.is_usable(self.cache.max_stale):
+                self._revalidate_in_background(endpoint, params, entry)
+                return entry.body
+
+        try:
+            return self._fetch(endpoint, params, entry)
+        except requests.RequestException as e:
+            if entry and entry.is_usable(self.cache.max_stale):
+                Logger.warning(f"API request failed, serving cached response: {e}")
+                return entry.body
+            raise
+
+    def _fetch(self, endpoint: str, params: Dict, entry=None) -> Dict:
+        headers = {}
+        if entry and entry.etag:
+            headers["If-None-Match"] = entry.etag
+
+        if self.quota and not self.quota.can_afford(endpoint):
+            raise QuotaExceededError(
+                f"Daily quota exhausted ({self.quota.remaining} units left, "
+                f"{endpoint} costs {self.quota.cost(endpoint)})"
+            )
+
+        response = self.transport.get(
+            f"{self.base_url}/{endpoint}", params=params, headers=headers, timeout=10
+        )
+
+        if self.quota:
+            self.quota.charge(endpoint)
+            if self._is_quota_error(response):
+                self.quota.mark_exhausted()
+
+        if response.status_code == 304 and entry:
+            self.cache.touch(endpoint, params)
+            return entry.body
+
+        response.raise_for_status()
+        data = response.json()
+
+        if self.cache:
+            etag = response.headers.get("ETag") or data.get("etag")
+            self.cache.put(endpoint, params, data, etag)
+
+        return data
+
+    def _is_quota_error(self, response) -> bool:
+        if response.status_code != 403:
+            return False
+        try:
+            errors = response.json().get("error", {}).get("errors", [])
+        except ValueError:
+            return False
+        return any(
+            error.get("reason") in ("quotaExceeded", "dailyLimitExceeded")
+            for error in errors
+        )
+
+    def _revalidate_in_background(self, endpoint: str, params: Dict, entry):
+        key = ResponseCache.make_key(endpoint, params)
+        with self._revalidating_lock:
+            if key in self._revalidating:
+                return
+            self._revalidating.add(key)
+
+        def revalidate():
+            try:
+                self._fetch(endpoint, params, entry)
+            except Exception as e:
+                Logger.debug(f"Background revalidation failed: {e}")
+            finally:
+                with self._revalidating_lock:
+                    self._revalidating.discard(key)
+
+        threading.Thread(target=revalidate, daemon=True).start()
+
     def search_videos(self, query: str, max_results: int = 20) -> List[Dict]:
+        return self.search_page(query, max_results=max_results)[0]
+
+    def search_page(
+        self, query: str, page_token: Optional[str] = None, max_results: int = 20
+    ) -> Tuple[List[Dict], Optional[str]]:
         if not self.api_key:
             Logger.error("YouTube API key not configured")
-            return self._get_demo_videos()
+            return self._get_demo_videos(), None
 
         try:
-            url = f"{self.base_url}/search"
             params = {
                 "part": "snippet",
                 "q": query,
@@ -40,95 +189,162 @@ class YouTubeAPI:
                 "order": "relevance",
                 "safeSearch": "moderate",
             }
+            if page_token:
+                params["pageToken"] = page_token
 
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
-
-            data = response.json()
-            videos = []
-
-            for item in data.get("items", []):
-                try:
-                    if isinstance(item, dict):
-                        video = self._parse_video_item(item)
-                        if video:
-                            videos.append(video)
-                    else:
-                        Logger.warning(f"Unexpected item type: {type(item)} - {item}")
-                except Exception as e:
-                    Logger.error(f"Error parsing video item: {e} - Item: {item}")
-                    continue
-
-            return videos
+            data = self._request("search", params)
+            videos = self.enrich_videos(self._parse_items(data.get("items", [])))
+            return videos, data.get("nextPageToken")
 
         except requests.RequestException as e:
             Logger.error(f"API request failed: {e}")
-            return self._get_demo_videos()
+            return self._page_fallback(page_token)
         except Exception as e:
             Logger.error(f"Search error: {e}")
-            return self._get_demo_videos()
+            return self._page_fallback(page_token)
+
+    def search_cursor(self, query: str, max_results: int = 20) -> "ResultCursor":
+        # Each search page costs 100 units; only fetch ahead while the budget allows
+        return ResultCursor(
+            lambda token: self.search_page(query, token, max_results),
+            prefetch=not self._quota_is_low(),
+        )
 
     def get_trending_videos(
         self, region_code: str = "US", max_results: int = 20
     ) -> List[Dict]:
+        return self.trending_page(region_code, max_results=max_results)[0]
+
+    def trending_page(
+        self,
+        region_code: str = "US",
+        page_token: Optional[str] = None,
+        max_results: int = 20,
+    ) -> Tuple[List[Dict], Optional[str]]:
         if not self.api_key:
             Logger.warning("YouTube API key not configured, using demo data")
-            return self._get_demo_videos()
+            return self._get_demo_videos(), None
 
         try:
-            url = f"{self.base_url}/videos"
             params = {
-                "part": "snippet,statistics",
+                "part": "snippet,statistics,contentDetails",
                 "chart": "mostPopular",
                 "regionCode": region_code,
                 "maxResults": max_results,
                 "key": self.api_key,
                 "videoCategoryId": "0",
             }
+            if page_token:
+                params["pageToken"] = page_token
 
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
-
-            data = response.json()
-            videos = []
-
-            for item in data.get("items", []):
-                try:
-                    if isinstance(item, dict):
-                        video = self._parse_video_item(item, include_stats=True)
-                        if video:
-                            videos.append(video)
-                    else:
-                        Logger.warning(f"Unexpected item type: {type(item)} - {item}")
-                except Exception as e:
-                    Logger.error(f"Error parsing video item: {e} - Item: {item}")
-                    continue
-
-            return videos
+            data = self._request("videos", params)
+            videos = self._parse_items(
+                data.get("items", []), include_stats=True, include_details=True
+            )
+            return videos, data.get("nextPageToken")
 
         except requests.RequestException as e:
             Logger.error(f"API request failed: {e}")
-            return self._get_demo_videos()
+            return self._page_fallback(page_token)
         except Exception as e:
             Logger.error(f"Trending videos error: {e}")
-            return self._get_demo_videos()
+            return self._page_fallback(page_token)
+
+    def trending_cursor(
+        self, region_code: str = "US", max_results: int = 20
+    ) -> "ResultCursor":
+        return ResultCursor(
+            lambda token: self.trending_page(region_code, token, max_results)
+        )
+
+    def _page_fallback(
+        self, page_token: Optional[str]
+    ) -> Tuple[List[Dict], Optional[str]]:
+        # The first page falls back to demo data; later pages return nothing
+        # and keep their token so the cursor can retry them.
+        if page_token is None:
+            return self._get_demo_videos(), None
+        return [], page_token
+
+    def _parse_items(self, items: List, **parse_kwargs) -> List[Dict]:
+        videos = []
+
+        for item in items:
+            try:
+                if isinstance(item, dict):
+                    video = self._parse_video_item(item, **parse_kwargs)
+                    if video:
+                        videos.append(video)
+                else:
+                    Logger.warning(f"Unexpected item type: {type(item)} - {item}")
+            except Exception as e:
+                Logger.error(f"Error parsing video item: {e} - Item: {item}")
+                continue
+
+        return videos
+
+    def enrich_videos(self, videos: List[Dict]) -> List[Dict]:
+        """Merge statistics and duration into ``videos`` in place.
+
+        search.list returns snippets only, so the missing fields are fetched
+        with one videos.list call per 50 ids.
+        """
+        if not self.api_key:
+            return videos
+
+        missing = [
+            video["video_id"]
+            for video in videos
+            if video.get("video_id") and "duration" not in video
+        ]
+
+        enrichment = {}
+        for start in range(0, len(missing), ENRICH_BATCH_SIZE):
+            batch = missing[start : start + ENRICH_BATCH_SIZE]
+            try:
+                enrichment.update(self._fetch_video_stats(batch))
+            except Exception as e:
+                Logger.error(f"Video enrichment error: {e}")
+
+        for video in videos:
+            video.update(enrichment.get(video.get("video_id"), {}))
+
+        return videos
+
+    def _fetch_video_stats(self, video_ids: List[str]) -> Dict[str, Dict]:
+        params = {
+            "part": "statistics,contentDetails",
+            "id": ",".join(video_ids),
+            "maxResults": len(video_ids),
+            "key": self.api_key,
+        }
+
+        data = self._request("videos", params)
+        stats = {}
+
+        for item in data.get("items", []):
+            video = self._parse_video_item(
+                item, include_stats=True, include_details=True
+            )
+            if video:
+                stats[video["video_id"]] = {
+                    key: video[key] for key in ENRICHED_FIELDS if key in video
+                }
+
+        return stats
 
     def get_video_details(self, video_id: str) -> Optional[Dict]:
         if not self.api_key:
             return None
 
         try:
-            url = f"{self.base_url}/videos"
             params = {
                 "part": "snippet,statistics,contentDetails",
                 "id": video_id,
                 "key": self.api_key,
             }
 
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
-
-            data = response.json()
+            data = self._request("videos", params)
             items = data.get("items", [])
 
             if items:
@@ -174,6 +390,7 @@ class YouTubeAPI:
             "description": snippet.get("description", ""),
             "published_at": snippet.get("publishedAt", ""),
             "thumbnail_url": self._get_best_thumbnail(snippet.get("thumbnails", {})),
+            "thumbnails": self._get_thumbnail_variants(snippet.get("thumbnails", {})),
         }
 
         if include_stats and "statistics" in item:
@@ -205,6 +422,18 @@ class YouTubeAPI:
                 return thumbnails[quality]["url"]
         return ""
 
+    def _get_thumbnail_variants(self, thumbnails: Dict) -> Dict:
+        """All thumbnail sizes, so the UI can pick one matching its layout."""
+        return {
+            quality: {
+                "url": variant["url"],
+                "width": variant.get("width", 0),
+                "height": variant.get("height", 0),
+            }
+            for quality, variant in thumbnails.items()
+            if isinstance(variant, dict) and variant.get("url")
+        }
+
     def _format_view_count(self, view_count: str) -> str:
         try:
             count = int(view_count)
@@ -269,3 +498,74 @@ class YouTubeAPI:
                 "view_count": "97M views",
             },
         ]
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into a single call."""
+
+    def __init__(self):
+        self._calls: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn: Callable):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+
+class ResultCursor:
+    """Walks a paginated API listing one page per ``fetch_next`` call.
+
+    ``prefetch_enabled`` tells callers whether fetching a page before it is
+    needed is affordable; the cursor itself never fetches ahead.
+    """
+
+    def __init__(
+        self,
+        fetch_page: Callable[[Optional[str]], Tuple[List[Dict], Optional[str]]],
+        prefetch: bool = True,
+    ):
+        self.fetch_page = fetch_page
+        self.prefetch_enabled = prefetch
+        self.videos: List[Dict] = []
+        self.next_page_token: Optional[str] = None
+        self.started = False
+        self._lock = threading.Lock()
+
+    @property
+    def has_more(self) -> bool:
+        return not self.started or self.next_page_token is not None
+
+    def fetch_next(self) -> List[Dict]:
+        with self._lock:
+            if not self.has_more:
+                return []
+
+            token = self.next_page_token
+            batch, next_token = self.fetch_page(token)
+
+            if not batch and next_token == token and self.started:
+                # Fetch failed; keep the token so the next call retries it.
+                return []
+
+            self.started = True
+            self.videos.extend(batch)
+            self.next_page_token = next_token
+            return batch